@@ -0,0 +1,90 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+PREFIX = 'auth:token'
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.TOKEN_TTL)
+
+
+def is_expired(token):
+    return settings.TOKEN_TTL is not None and token.created < expiry_cutoff()
+
+
+class TokenCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def shared_key(self, key):
+        return f'{PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                token, stored_at = entry
+                if time.monotonic() - stored_at < settings.TOKEN_CACHE_TTL:
+                    self.entries.move_to_end(key)
+                    return token
+                del self.entries[key]
+        if not settings.TOKEN_CACHE_SHARED:
+            return None
+        token = cache.get(self.shared_key(key))
+        if token is not None:
+            self.store(key, token)
+        return token
+
+    def store(self, key, token):
+        with self.lock:
+            self.entries[key] = (token, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def set(self, key, token):
+        self.store(key, token)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                self.shared_key(key), token, settings.TOKEN_CACHE_SHARED_TTL
+            )
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if settings.TOKEN_CACHE_SHARED and keys:
+            cache.delete_many([self.shared_key(key) for key in keys])
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed('Недействительный токен')
+            token_cache.set(key, token)
+        if not token.user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен или удалён')
+        if is_expired(token):
+            token_cache.invalidate((key,))
+            raise AuthenticationFailed('Срок действия токена истёк')
+        return (copy.copy(token.user), token)
@@ -0,0 +1,514 @@
+import base64
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.backends.signals import connection_created
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes import counters, search, shopping_list
+from recipes.autocomplete import ingredient_index
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscribe
+
+from . import caching
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'benchmark.local'
+PASSWORD = 'benchmark-password'
+IMAGE_NAME = 'recipes/images/benchmark.png'
+BATCH_SIZE = 500
+WORDS = (
+    'суп', 'салат', 'пирог', 'соус', 'запеканка', 'каша', 'рагу', 'котлеты',
+    'быстрый', 'домашний', 'острый', 'сладкий', 'овощной', 'куриный',
+    'рыбный', 'праздничный', 'летний', 'зимний', 'постный', 'сытный',
+)
+
+
+def benchmark_users():
+    return User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+
+
+def sample(rng, population, count):
+    return rng.sample(population, min(count, len(population)))
+
+
+def image_data_uri():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def ensure_image():
+    if not default_storage.exists(IMAGE_NAME):
+        data = image_data_uri().split(';base64,', 1)[1]
+        default_storage.save(IMAGE_NAME, ContentFile(base64.b64decode(data)))
+
+
+def ensure_ingredients(count):
+    existing = Ingredient.objects.count()
+    if existing < count:
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(
+                    name=f'Бенчмарк ингредиент {number}',
+                    measurement_unit='г',
+                )
+                for number in range(existing, count)
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    return list(Ingredient.objects.values_list('id', flat=True))
+
+
+def ensure_tags():
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create([
+            Tag(name='Завтрак', color='#E26C2D', slug='breakfast'),
+            Tag(name='Обед', color='#49B64E', slug='lunch'),
+            Tag(name='Ужин', color='#8775D2', slug='dinner'),
+        ])
+    return list(Tag.objects.values_list('id', flat=True))
+
+
+def clear():
+    deleted, _ = benchmark_users().delete()
+    caching.bump((caching.NAMESPACE, caching.ALL))
+    return deleted
+
+
+@transaction.atomic
+def seed(users, recipes, ingredients_per_recipe, subscriptions, favorites,
+         carts, random_seed=0):
+    rng = random.Random(random_seed)
+    clear()
+    ensure_image()
+    ingredient_ids = ensure_ingredients(max(ingredients_per_recipe * 10, 200))
+    tag_ids = ensure_tags()
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                email=f'user{number}@{EMAIL_DOMAIN}',
+                username=f'benchmark_user_{number}',
+                first_name='Бенчмарк',
+                last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(benchmark_users().values_list('id', flat=True))
+    Token.objects.bulk_create(
+        [Token(key=Token.generate_key(), user_id=pk) for pk in user_ids],
+        batch_size=BATCH_SIZE,
+    )
+    Recipe.objects.bulk_create(
+        [
+            Recipe(
+                name=' '.join(rng.choice(WORDS) for _ in range(3)),
+                text=' '.join(rng.choice(WORDS) for _ in range(40)),
+                author_id=rng.choice(user_ids),
+                image=IMAGE_NAME,
+                cooking_time=rng.randint(5, 180),
+            )
+            for _ in range(recipes)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(author_id__in=user_ids).values_list(
+            'id', flat=True
+        )
+    )
+    IngredientInRecipe.objects.bulk_create(
+        [
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(
+                rng, ingredient_ids, ingredients_per_recipe
+            )
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    Recipe.tags.through.objects.bulk_create(
+        [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in sample(rng, tag_ids, rng.randint(1, 2))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    Subscribe.objects.bulk_create(
+        [
+            Subscribe(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in sample(
+                rng, [pk for pk in user_ids if pk != user_id], subscriptions
+            )
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    for model, count in ((Favourite, favorites), (ShoppingCart, carts)):
+        model.objects.bulk_create(
+            [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in sample(rng, recipe_ids, count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    shopping_list.rebuild(user_ids)
+    counters.reconcile()
+    search.update_index(recipe_ids)
+    ingredient_index.invalidate()
+    caching.bump(
+        (caching.NAMESPACE, caching.ALL, caching.TAGS, caching.INGREDIENTS)
+    )
+    return {
+        'users': len(user_ids),
+        'recipes': len(recipe_ids),
+        'ingredients': len(ingredient_ids),
+    }
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ConnectionCounter:
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            self.count += 1
+
+    def opened(self):
+        if not is_pooled():
+            return self.count
+        from foodgram.pool.base import _pools
+        return sum(pool.opened for pool in _pools.values())
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Context:
+    def __init__(self, rng, recipe_ids, ingredient_names, tag_ids):
+        self.rng = rng
+        self.recipe_ids = recipe_ids
+        self.ingredient_names = ingredient_names
+        self.tag_ids = tag_ids
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)[:200]
+        )
+        self.own_recipes = {}
+        self.created = []
+        self.lock = threading.Lock()
+
+    def recipe_payload(self, name=None):
+        return {
+            'name': name or ' '.join(
+                self.rng.choice(WORDS) for _ in range(3)
+            ),
+            'text': ' '.join(self.rng.choice(WORDS) for _ in range(40)),
+            'cooking_time': self.rng.randint(5, 180),
+            'tags': self.rng.sample(self.tag_ids, 1),
+            'ingredients': [
+                {'id': pk, 'amount': self.rng.randint(1, 500)}
+                for pk in self.rng.sample(self.ingredient_ids, 5)
+            ],
+            'image': image_data_uri(),
+        }
+
+
+def feed(context, client):
+    return 'get', f'/api/recipes/?page={context.rng.randint(1, 5)}', {}
+
+
+def recipe_detail(context, client):
+    return 'get', f'/api/recipes/{context.rng.choice(context.recipe_ids)}/', {}
+
+
+def subscriptions(context, client):
+    return 'get', '/api/users/subscriptions/?recipes_limit=3', {}
+
+
+def ingredient_autocomplete(context, client):
+    name = context.rng.choice(context.ingredient_names)
+    prefix = name[:context.rng.randint(1, min(len(name), 4))]
+    return 'get', '/api/ingredients/', {'data': {'name': prefix}}
+
+
+def recipe_search(context, client):
+    return 'get', '/api/recipes/', {
+        'data': {'search': context.rng.choice(WORDS)}
+    }
+
+
+def recipe_create(context, client):
+    return 'post', '/api/recipes/', {
+        'data': context.recipe_payload(), 'format': 'json'
+    }
+
+
+def recipe_update(context, client):
+    recipe_id = context.own_recipes.get(id(client))
+    if recipe_id is None:
+        response = client.post(
+            '/api/recipes/', context.recipe_payload(), format='json'
+        )
+        recipe_id = response.json()['id']
+        with context.lock:
+            context.own_recipes[id(client)] = recipe_id
+            context.created.append(recipe_id)
+    payload = context.recipe_payload()
+    del payload['image']
+    return 'patch', f'/api/recipes/{recipe_id}/', {
+        'data': payload, 'format': 'json'
+    }
+
+
+def shopping_cart_download(context, client):
+    return 'get', '/api/recipes/download_shopping_cart/', {}
+
+
+SCENARIOS = {
+    'feed': (feed, True),
+    'feed_anonymous': (feed, False),
+    'recipe_detail': (recipe_detail, True),
+    'recipe_search': (recipe_search, True),
+    'subscriptions': (subscriptions, True),
+    'ingredient_autocomplete': (ingredient_autocomplete, True),
+    'recipe_create': (recipe_create, True),
+    'recipe_update': (recipe_update, True),
+    'shopping_cart_download': (shopping_cart_download, True),
+}
+
+
+def make_clients(count, authenticated):
+    tokens = list(
+        Token.objects.filter(
+            user__email__endswith=f'@{EMAIL_DOMAIN}'
+        ).values_list('key', flat=True)[:count]
+    )
+    if authenticated and not tokens:
+        raise ValueError('No benchmark users, run seed_benchmark_data first')
+    clients = []
+    for number in range(count):
+        client = APIClient()
+        if authenticated:
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {tokens[number % len(tokens)]}'
+            )
+        clients.append(client)
+    return clients
+
+
+def perform(client, method, path, options):
+    close_old_connections()
+    try:
+        response = getattr(client, method)(path, **options)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    finally:
+        close_old_connections()
+    return response
+
+
+def worker(scenario, context, client, requests, warmup, samples):
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        for number in range(warmup + requests):
+            method, path, options = scenario(context, client)
+            counter.count = 0
+            started = time.perf_counter()
+            response = perform(client, method, path, options)
+            elapsed = time.perf_counter() - started
+            if method == 'post' and response.status_code == 201:
+                with context.lock:
+                    context.created.append(response.json()['id'])
+            if number >= warmup:
+                samples.append(
+                    (elapsed, counter.count, response.status_code >= 400)
+                )
+    connection.close()
+
+
+def run_scenario(name, context, requests, warmup, concurrency):
+    scenario, authenticated = SCENARIOS[name]
+    clients = make_clients(concurrency, authenticated)
+    samples = []
+    share, extra = divmod(requests, concurrency)
+    connections = ConnectionCounter()
+    connection_created.connect(connections)
+    opened = connections.opened()
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(
+                scenario, context, client,
+                share + (1 if number < extra else 0), warmup, samples,
+            ),
+        )
+        for number, client in enumerate(clients)
+    ]
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker(scenario, context, clients[0], requests, warmup, samples)
+    else:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    connection_created.disconnect(connections)
+    opened = connections.opened() - opened
+    latencies = [elapsed * 1000 for elapsed, _, _ in samples]
+    queries = [count for _, count, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, failed in samples if failed),
+        'concurrency': concurrency,
+        'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(max(latencies), 3),
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+        'connections_opened': opened,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def is_pooled():
+    return connection.settings_dict['ENGINE'] == 'foodgram.pool'
+
+
+def connection_mode():
+    settings_dict = connection.settings_dict
+    return {
+        'engine': settings_dict['ENGINE'],
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'pool': settings_dict.get('POOL') if is_pooled() else None,
+    }
+
+
+def set_conn_max_age(value):
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = value
+
+
+def metadata(options):
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'connections': connection_mode(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': {
+            'users': benchmark_users().count(),
+            'recipes': Recipe.objects.count(),
+            'ingredients': Ingredient.objects.count(),
+        },
+        'options': options,
+    }
+
+
+def run(names, requests, warmup, concurrency, random_seed=0,
+        conn_max_age=None):
+    if conn_max_age is not None:
+        set_conn_max_age(conn_max_age)
+    rng = random.Random(random_seed)
+    context = Context(
+        rng,
+        list(Recipe.objects.values_list('id', flat=True)[:1000]),
+        list(Ingredient.objects.values_list('name', flat=True)[:1000]),
+        list(Tag.objects.values_list('id', flat=True)),
+    )
+    try:
+        return {
+            name: run_scenario(name, context, requests, warmup, concurrency)
+            for name in names
+        }
+    finally:
+        Recipe.objects.filter(id__in=context.created).delete()
+
+
+def compare(results, baseline):
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p50', 'p95', 'p99'):
+            before = previous['latency_ms'][metric]
+            after = current['latency_ms'][metric]
+            change = (after - before) / before * 100 if before else 0
+            rows.append((name, metric, before, after, change))
+        before = previous['queries_per_request']['mean']
+        after = current['queries_per_request']['mean']
+        rows.append((name, 'queries', before, after, (
+            (after - before) / before * 100 if before else 0
+        )))
+        if 'connections_opened' in previous:
+            before = previous['connections_opened']
+            after = current['connections_opened']
+            rows.append((name, 'connects', before, after, (
+                (after - before) / before * 100 if before else 0
+            )))
+    return rows
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipes.batches import CommitBatch
+from recipes.models import Recipe, Tag
+
+PREFIX = 'recipes'
+NAMESPACE = 'namespace'
+ALL = 'all'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _version_key(scope):
+    return f'{PREFIX}:version:{scope}'
+
+
+def _changed_key(scope):
+    return f'{PREFIX}:changed:{scope}'
+
+
+def viewer_scope(user):
+    return f'viewer:{user.pk}'
+
+
+def state(scopes):
+    version_keys = [_version_key(scope) for scope in scopes]
+    changed_keys = [_changed_key(scope) for scope in scopes]
+    found = cache.get_many(version_keys + changed_keys)
+    missing = {key: uuid.uuid4().hex for key in version_keys}
+    missing.update((key, time.time()) for key in changed_keys)
+    missing = {
+        key: value for key, value in missing.items() if key not in found
+    }
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return (
+        [found[key] for key in version_keys],
+        max(found[key] for key in changed_keys),
+    )
+
+
+def versions(scopes):
+    return state(scopes)[0]
+
+
+def bump(scopes):
+    now = time.time()
+    values = {}
+    for scope in scopes:
+        values[_version_key(scope)] = uuid.uuid4().hex
+        values[_changed_key(scope)] = now
+    cache.set_many(values, None)
+
+
+def _params(request):
+    return sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+
+
+def _key(kind, request, scopes):
+    raw = repr((request.get_host(), _params(request), versions(scopes)))
+    return f'{PREFIX}:{kind}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def list_scopes(request):
+    params = request.query_params
+    scopes = [f'tag:{slug}' for slug in sorted(set(params.getlist('tags')))]
+    if params.get('author'):
+        scopes.append(f'author:{params.get("author")}')
+    return [NAMESPACE] + (scopes or [ALL])
+
+
+def detail_scopes(pk):
+    return [NAMESPACE, f'recipe:{pk}']
+
+
+def list_key(request):
+    return _key('list', request, list_scopes(request))
+
+
+def detail_key(request, pk):
+    return _key('detail', request, detail_scopes(pk))
+
+
+def count_key(queryset, user):
+    scopes = [ALL]
+    if not user.is_anonymous:
+        scopes.append(viewer_scope(user))
+    raw = repr((queryset.query.sql_with_params(), versions(scopes)))
+    return f'{PREFIX}:count:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    with _stats_lock:
+        hits = _stats['hits']
+        misses = _stats['misses']
+    total = hits + misses
+    return {
+        'process': os.getpid(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def cached_response(make_key, view):
+    key = make_key()
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return Response(data, headers={'X-Cache': 'HIT'})
+    _count('misses')
+    response = view()
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def conditional_response(request, view, scopes, modified=None,
+                         per_viewer=False):
+    scopes = list(scopes)
+    if per_viewer and not request.user.is_anonymous:
+        scopes.append(viewer_scope(request.user))
+    current, changed = state(scopes)
+    raw = repr((
+        request.get_host(), request.path, _params(request),
+        scopes, current, modified,
+    ))
+    etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+    last_modified = int(max(changed, modified or 0))
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = view()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    if per_viewer:
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def _flush(recipes=(), tags=(), scopes=()):
+    scopes = set(scopes)
+    tag_ids = set(tags)
+    if recipes:
+        scopes.add(ALL)
+        rows = Recipe.objects.filter(id__in=recipes).values_list(
+            'id', 'author_id', 'tags'
+        )
+        for recipe_id, author_id, tag_id in rows:
+            scopes.add(f'author:{author_id}')
+            if tag_id is not None:
+                tag_ids.add(tag_id)
+        scopes.update(f'recipe:{pk}' for pk in recipes)
+    if tag_ids:
+        scopes.update(
+            f'tag:{slug}'
+            for slug in Tag.objects.filter(id__in=tag_ids).values_list(
+                'slug', flat=True
+            )
+        )
+    if scopes:
+        bump(scopes)
+
+
+_batch = CommitBatch(_flush)
+
+
+def invalidate(recipe_ids=(), tag_ids=(), scopes=()):
+    _batch.add(recipes=recipe_ids, tags=tag_ids, scopes=scopes)
+
+
+def invalidate_deleted(recipe):
+    invalidate(
+        tag_ids=recipe.tags.values_list('id', flat=True),
+        scopes=(ALL, f'recipe:{recipe.pk}', f'author:{recipe.author_id}'),
+    )
+
+
+def invalidate_viewer(user):
+    transaction.on_commit(partial(bump, (viewer_scope(user),)))
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+from datetime import date
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListExporter(BaseRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def filename(self, user):
+        return f'{user.username}_shopping_list.{self.format}'
+
+    def stream(self, user, ingredients):
+        raise NotImplementedError
+
+
+class TextExporter(ShoppingListExporter):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, user, ingredients):
+        today = date.today()
+        yield (
+            f'Список покупок для: {user.get_full_name()}\n\n'
+            f'Дата: {today.day}.{today.month}.{today.year}. \n\n'
+        )
+        for ingredient in ingredients:
+            yield (
+                f'- {ingredient["ingredient__name"]}: '
+                f' {ingredient["amount"]}'
+                f' {ingredient["ingredient__measurement_unit"]}.\n'
+            )
+
+
+class CSVExporter(ShoppingListExporter):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, user, ingredients):
+        writer = csv.writer(Echo())
+        yield '\ufeff' + writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения')
+        )
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['amount'],
+                ingredient['ingredient__measurement_unit'],
+            ))
+
+
+class PDFExporter(ShoppingListExporter):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+
+    def get_font(self):
+        if self.font_name in pdfmetrics.getRegisteredFontNames():
+            return self.font_name
+        if not os.path.exists(settings.SHOPPING_LIST_FONT):
+            return 'Helvetica'
+        pdfmetrics.registerFont(
+            TTFont(self.font_name, settings.SHOPPING_LIST_FONT)
+        )
+        return self.font_name
+
+    def stream(self, user, ingredients):
+        buffer = io.BytesIO()
+        font = self.get_font()
+        page = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        page.setFont(font, 14)
+        today = date.today()
+        page.drawString(
+            40, height - 50, f'Список покупок для: {user.get_full_name()}'
+        )
+        page.setFont(font, 10)
+        page.drawString(
+            40, height - 70, f'Дата: {today.day}.{today.month}.{today.year}.'
+        )
+        y = height - 100
+        for ingredient in ingredients:
+            if y < 40:
+                page.showPage()
+                page.setFont(font, 10)
+                y = height - 50
+            page.drawString(
+                40, y,
+                f'- {ingredient["ingredient__name"]}: '
+                f'{ingredient["amount"]} '
+                f'{ingredient["ingredient__measurement_unit"]}.'
+            )
+            y -= 16
+        page.save()
+        buffer.seek(0)
+        for chunk in iter(lambda: buffer.read(CHUNK_SIZE), b''):
+            yield chunk
+
+
+SHOPPING_LIST_EXPORTERS = (TextExporter, CSVExporter, PDFExporter)
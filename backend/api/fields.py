@@ -0,0 +1,81 @@
+import binascii
+import imghdr
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile
+)
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import CharField, ImageField
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_TYPES = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+WHITESPACE = str.maketrans('', '', ' \t\r\n')
+
+
+def split_data_uri(data):
+    separator = data.find(';base64,', 0, 256)
+    if separator < 0 or not data.startswith('data:image/'):
+        raise ValidationError('Загрузите изображение в формате base64')
+    return data[len('data:'):separator], separator + len(';base64,')
+
+
+def check_size(size):
+    if size > settings.RECIPE_IMAGE_MAX_SIZE:
+        raise ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.RECIPE_IMAGE_MAX_SIZE} байт'
+        )
+
+
+def decode_to_file(data, destination, start=0):
+    remainder = ''
+    for position in range(start, len(data), CHUNK_SIZE):
+        chunk = remainder + data[position:position + CHUNK_SIZE].translate(
+            WHITESPACE
+        )
+        aligned = len(chunk) - len(chunk) % 4
+        destination.write(binascii.a2b_base64(chunk[:aligned]))
+        remainder = chunk[aligned:]
+    if remainder:
+        raise binascii.Error('Incorrect padding')
+
+
+class DeferredBase64ImageField(CharField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('trim_whitespace', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        _, start = split_data_uri(data)
+        check_size((len(data) - start) * 3 // 4)
+        return data
+
+
+class StreamingBase64ImageField(ImageField):
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            check_size(data.size)
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            raise ValidationError('Загрузите изображение в формате base64')
+        content_type, start = split_data_uri(data)
+        check_size((len(data) - start) * 3 // 4)
+        upload = TemporaryUploadedFile(
+            f'{uuid.uuid4()}.tmp', content_type, 0, None
+        )
+        try:
+            decode_to_file(data, upload, start)
+        except (binascii.Error, ValueError):
+            upload.close()
+            raise ValidationError('Некорректные данные изображения')
+        upload.size = upload.tell()
+        upload.seek(0)
+        extension = imghdr.what(upload.file)
+        if extension not in IMAGE_TYPES:
+            upload.close()
+            raise ValidationError('Неподдерживаемый формат изображения')
+        upload.name = f'{uuid.uuid4()}.{extension}'
+        return super().to_internal_value(upload)
@@ -0,0 +1,117 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the API hot paths against the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            choices=tuple(benchmarks.SCENARIOS),
+            default=tuple(benchmarks.SCENARIOS),
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Measured requests per scenario',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Unmeasured requests per client before measuring',
+        )
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            help='Override CONN_MAX_AGE for the run, '
+                 '0 opens a new connection for every request',
+        )
+        parser.add_argument('--output', help='Write results to a JSON file')
+        parser.add_argument(
+            '--compare', help='JSON results of a previous run to diff against'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+        run_options = {
+            name: options[name]
+            for name in (
+                'requests', 'warmup', 'concurrency', 'seed', 'conn_max_age'
+            )
+        }
+        try:
+            scenarios = benchmarks.run(
+                options['scenarios'],
+                options['requests'],
+                options['warmup'],
+                options['concurrency'],
+                options['seed'],
+                options['conn_max_age'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        results = {
+            'meta': benchmarks.metadata(run_options),
+            'scenarios': scenarios,
+        }
+        self.report_connections(results['meta']['connections'])
+        self.report(scenarios)
+        if baseline is not None:
+            self.report_comparison(benchmarks.compare(scenarios, baseline))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def report_connections(self, mode):
+        pool = mode['pool']
+        self.stdout.write(
+            f'Connections: {mode["engine"]}, '
+            f'CONN_MAX_AGE={mode["conn_max_age"]}'
+            + (f', pool size {pool["SIZE"]}' if pool else '')
+        )
+
+    def report(self, scenarios):
+        self.stdout.write(
+            f'{"scenario":<26}{"rps":>9}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"p99 ms":>10}{"queries":>9}{"connects":>10}{"errors":>8}'
+        )
+        for name, result in scenarios.items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:<26}{result["throughput_rps"]:>9.1f}'
+                f'{latency["p50"]:>10.2f}{latency["p95"]:>10.2f}'
+                f'{latency["p99"]:>10.2f}'
+                f'{result["queries_per_request"]["mean"]:>9.1f}'
+                f'{result["connections_opened"]:>10}'
+                f'{result["errors"]:>8}'
+            )
+
+    def report_comparison(self, rows):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"scenario":<26}{"metric":<9}{"before":>10}{"after":>10}'
+            f'{"change":>10}'
+        )
+        for name, metric, before, after, change in rows:
+            line = (
+                f'{name:<26}{metric:<9}{before:>10.2f}{after:>10.2f}'
+                f'{change:>+9.1f}%'
+            )
+            if change > 10:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Create a reproducible dataset for the API benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=10,
+            help='Subscriptions per user',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20, help='Favorites per user'
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=5,
+            help='Shopping cart recipes per user',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Only remove previously generated benchmark data',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = benchmarks.clear()
+            self.stdout.write(self.style.SUCCESS(f'Rows deleted: {deleted}'))
+            return
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('At least 2 users and 1 recipe are required')
+        started = time.monotonic()
+        created = benchmarks.seed(
+            options['users'],
+            options['recipes'],
+            options['ingredients_per_recipe'],
+            options['subscriptions'],
+            options['favorites'],
+            options['carts'],
+            options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {created["users"]} users, {created["recipes"]} recipes '
+            f'and {created["ingredients"]} ingredients '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -1,6 +1,96 @@
-from rest_framework.pagination import PageNumberPagination
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from . import caching
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, user=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        key = caching.count_key(self.object_list, self.user)
+        cached = cache.get(key)
+        if cached is not None:
+            count, self.count_is_exact = cached
+            return count
+        count = estimate_count(self.object_list)
+        if count is not None and count >= settings.PAGINATION_ESTIMATE_FROM:
+            self.count_is_exact = False
+        else:
+            count = self.object_list.count()
+        cache.set(
+            key,
+            (count, self.count_is_exact),
+            settings.PAGINATION_COUNT_TIMEOUT,
+        )
+        return count
+
+
+class IdCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if ordering in (('id',), ('-id',)):
+            return ordering
+        return (self.ordering,)
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_paginator = None
+
+    @property
+    def django_paginator_class(self):
+        return partial(CachedCountPaginator, user=self.request.user)
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or IdCursorPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.use_cursor(request):
+            self.cursor_paginator = IdCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        response.data['count_is_exact'] = self.page.paginator.count_is_exact
+        return response
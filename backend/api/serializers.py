@@ -1,22 +1,49 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
-from django.db.models import F
-from django.shortcuts import get_object_or_404
-from djoser.serializers import UserCreateSerializer, UserSerializer
+from djoser.serializers import (
+    TokenCreateSerializer, UserCreateSerializer, UserSerializer
+)
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import (IntegerField, ReadOnlyField,
+from rest_framework.fields import (IntegerField, ListField,
                                    SerializerMethodField)
 from rest_framework.relations import PrimaryKeyRelatedField
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, Serializer
 
+from recipes import shopping_list, uploads
+from recipes.images import thumbnail_urls
 from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
-from users.models import Subscribe
+
+from .authentication import expiry_cutoff
+from .fields import DeferredBase64ImageField, StreamingBase64ImageField
+from .timing import TimedSerializerMixin
+from .viewer import get_viewer
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return limit if limit >= 0 else None
+
+
+class TokenCreateSerializer(TokenCreateSerializer):
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if settings.TOKEN_TTL is not None:
+            Token.objects.filter(
+                user=self.user, created__lt=expiry_cutoff()
+            ).delete()
+        return attrs
+
+
 class UserCreateSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -26,7 +53,7 @@ class UserCreateSerializer(UserCreateSerializer):
         )
 
 
-class UserSerializer(UserSerializer):
+class UserSerializer(TimedSerializerMixin, UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta:
@@ -41,15 +68,11 @@ class UserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        if self.context.get('request').user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(
-            user=self.context.get('request').user, author=obj
-        ).exists()
+        viewer = get_viewer(self.context.get('request'))
+        return obj.id in viewer.subscription_ids
 
 
 class SubscribeSerializer(UserSerializer):
-    recipes_count = SerializerMethodField()
     recipes = SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -59,11 +82,6 @@ class SubscribeSerializer(UserSerializer):
     def validate(self, data):
         author = self.instance
         user = self.context.get('request').user
-        if Subscribe.objects.filter(author=author, user=user).exists():
-            raise ValidationError(
-                detail='Подписка уже существует',
-                code=status.HTTP_400_BAD_REQUEST,
-            )
         if user == author:
             raise ValidationError(
                 detail='Нельзя подписаться на самого себя',
@@ -71,20 +89,19 @@ class SubscribeSerializer(UserSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
-        serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
+        if hasattr(obj, 'latest_recipes'):
+            recipes = obj.latest_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = obj.recipes.all()[:limit]
+        serializer = RecipeShortSerializer(
+            recipes, many=True, read_only=True, context=self.context
+        )
         return serializer.data
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Ingredient
         fields = (
@@ -94,7 +111,7 @@ class IngredientSerializer(ModelSerializer):
         )
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Tag
         fields = (
@@ -105,13 +122,14 @@ class TagSerializer(ModelSerializer):
         )
 
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = SerializerMethodField()
     image = Base64ImageField()
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
+    thumbnails = SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -124,84 +142,33 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_status',
+            'thumbnails',
             'text',
             'cooking_time',
         )
 
     def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('ingredients__amount'),
-        )
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.ingredient_list.all()
+        ]
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
+        viewer = get_viewer(self.context.get('request'))
+        return obj.id in viewer.favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shopping_cart.filter(recipe=obj).exists()
-
-
-class IngredientInRecipeWriteSerializer(ModelSerializer):
-    id = ReadOnlyField(source='ingredient.id')
-    name = ReadOnlyField(source='ingredient.name')
-    measurement_unit = ReadOnlyField(
-        source='ingredient.measurement_unit',
-    )
-
-    class Meta:
-        model = IngredientInRecipe
-        fields = ('id', 'name', 'measurement_unit', 'amount')
-
-
-class RecipeReadSerializer(ModelSerializer):
-    tags = TagSerializer(many=True, read_only=True)
-    author = UserSerializer(read_only=True)
-    ingredients = SerializerMethodField()
-    image = Base64ImageField()
-    is_favorited = SerializerMethodField(read_only=True)
-    is_in_shopping_cart = SerializerMethodField(read_only=True)
-
-    class Meta:
-        model = Recipe
-        fields = (
-            'id',
-            'tags',
-            'author',
-            'ingredients',
-            'is_favorited',
-            'is_in_shopping_cart',
-            'name',
-            'image',
-            'text',
-            'cooking_time',
-        )
+        viewer = get_viewer(self.context.get('request'))
+        return obj.id in viewer.shopping_cart_ids
 
-    def get_ingredients(self, obj):
-        recipe = obj
-        ingredients = recipe.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('ingredients__amount')
-        )
-        return ingredients
-
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shopping_cart.filter(recipe=obj).exists()
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj, self.context.get('request'))
 
 
 class IngredientInRecipeWriteSerializer(ModelSerializer):
@@ -216,7 +183,7 @@ class RecipeWriteSerializer(ModelSerializer):
     tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientInRecipeWriteSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -231,24 +198,44 @@ class RecipeWriteSerializer(ModelSerializer):
             'cooking_time',
         )
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if settings.RECIPE_IMAGE_ASYNC:
+            fields['image'] = DeferredBase64ImageField(
+                required=not self.partial
+            )
+        return fields
+
+    def defer_image(self, validated_data):
+        if not settings.RECIPE_IMAGE_ASYNC or 'image' not in validated_data:
+            return None
+        validated_data['image_status'] = Recipe.IMAGE_PENDING
+        return validated_data.pop('image')
+
     def validate_ingredients(self, value):
         ingredients = value
         if not ingredients:
             raise ValidationError(
                 {'ingredients': 'Необходимо выбрать ингридиенты'}
             )
-        ingredients_list = []
+        ingredient_ids = [item['id'] for item in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValidationError({
+                'ingredients': 'Ингридиенты не должны повторяться'
+            })
+        if any(int(item['amount']) < 1 for item in ingredients):
+            raise ValidationError(
+                {'amount': 'Количество ингредиентов не может быть меньше нуля'}
+            )
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = set(ingredient_ids) - found.keys()
+        if missing:
+            raise ValidationError({
+                'ingredients': 'Ингредиенты не найдены: '
+                + ', '.join(str(pk) for pk in sorted(missing))
+            })
         for item in ingredients:
-            ingredient = get_object_or_404(Ingredient, id=item['id'])
-            if ingredient in ingredients_list:
-                raise ValidationError({
-                    'ingredients': 'Ингридиенты не должны повторяться'
-                })
-            if int(item['amount']) < 1:
-                raise ValidationError(
-                    {'amount': 'Количество ингредиентов не может быть меньше нуля'}
-                )
-            ingredients_list.append(ingredient)
+            item['ingredient'] = found[item['id']]
         return value
 
     def validate_tags(self, value):
@@ -267,7 +254,7 @@ class RecipeWriteSerializer(ModelSerializer):
         IngredientInRecipe.objects.bulk_create(
             [
                 IngredientInRecipe(
-                    ingredient=Ingredient.objects.get(id=ingredient['id']),
+                    ingredient=ingredient['ingredient'],
                     recipe=recipe,
                     amount=ingredient['amount'],
                 )
@@ -279,34 +266,100 @@ class RecipeWriteSerializer(ModelSerializer):
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        image = self.defer_image(validated_data)
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients_amounts(recipe=recipe, ingredients=ingredients)
+        if image is not None:
+            uploads.enqueue(recipe, image)
         return recipe
 
     @transaction.atomic
-    def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
+    def update_tags(self, recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+
+    def update_ingredients_amounts(self, recipe, ingredients):
+        current = {
+            item.ingredient_id: item for item in recipe.ingredient_list.all()
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in current.items()
+        }
+        new_amounts = {item['id']: item['amount'] for item in ingredients}
+        removed = current.keys() - new_amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, amount in new_amounts.items():
+            item = current.get(ingredient_id)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
         self.create_ingredients_amounts(
-            recipe=instance, ingredients=ingredients
+            recipe=recipe,
+            ingredients=[
+                item for item in ingredients if item['id'] not in current
+            ],
         )
-        instance.save()
+        shopping_list.change_recipe(recipe, old_amounts, new_amounts)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        image = self.defer_image(validated_data)
+        instance = super().update(instance, validated_data)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None:
+            self.update_ingredients_amounts(instance, ingredients)
+        if image is not None:
+            uploads.enqueue(instance, image)
         return instance
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if isinstance(image, UploadedFile):
+                image.close()
+
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_related().get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=context).data
 
 
-class RecipeShortSerializer(ModelSerializer):
+class RecipeShortSerializer(TimedSerializerMixin, ModelSerializer):
     image = Base64ImageField()
+    thumbnails = SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'thumbnails', 'cooking_time',)
+
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj, self.context.get('request'))
+
+
+class RecipeIdsSerializer(Serializer):
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
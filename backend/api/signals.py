@@ -0,0 +1,77 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+from . import caching
+from .authentication import token_cache
+
+User = get_user_model()
+
+PROFILE_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    caching.invalidate(recipe_ids=(instance.pk,))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    caching.invalidate_deleted(instance)
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredients_changed(instance, **kwargs):
+    caching.invalidate(recipe_ids=(instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            recipe_ids = instance.recipes.values_list('id', flat=True)
+            caching.invalidate(recipe_ids=recipe_ids, tag_ids=(instance.pk,))
+        else:
+            tag_ids = instance.tags.values_list('id', flat=True)
+            caching.invalidate(recipe_ids=(instance.pk,), tag_ids=tag_ids)
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            caching.invalidate(recipe_ids=pk_set, tag_ids=(instance.pk,))
+        else:
+            caching.invalidate(recipe_ids=(instance.pk,), tag_ids=pk_set)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    caching.invalidate(scopes=(caching.NAMESPACE, caching.TAGS))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    caching.invalidate(scopes=(caching.NAMESPACE, caching.INGREDIENTS))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    transaction.on_commit(partial(token_cache.invalidate, (instance.key,)))
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or PROFILE_FIELDS & set(update_fields):
+        caching.invalidate(
+            recipe_ids=instance.recipes.values_list('id', flat=True)
+        )
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    transaction.on_commit(partial(token_cache.invalidate, keys))
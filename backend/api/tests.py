@@ -0,0 +1,216 @@
+import os
+import tempfile
+from functools import partial
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from foodgram.testing import RecipeDataMixin, create_recipe
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class ApiDataMixin(RecipeDataMixin):
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+
+class RecipeListQueriesTest(ApiDataMixin, TestCase):
+    ANONYMOUS_QUERIES = 4
+    AUTHENTICATED_QUERIES = 7
+
+    def assert_constant_queries(self, client, queries):
+        client.get('/api/tags/')
+        for limit in (5, 10, 20):
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(queries):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list_queries(self):
+        self.assert_constant_queries(self.anonymous, self.ANONYMOUS_QUERIES)
+
+    def test_authenticated_list_queries(self):
+        self.assert_constant_queries(
+            self.client, self.AUTHENTICATED_QUERIES
+        )
+
+
+class RecipeUpdateQueriesTest(ApiDataMixin, TestCase):
+    UPDATE_QUERIES = 23
+
+    def test_single_amount_change(self):
+        recipe = create_recipe(
+            self.viewer,
+            self.tags[:1],
+            self.ingredients[:30],
+            name='Рецепт на 30 ингредиентов',
+        )
+        rows = dict(recipe.ingredient_list.values_list('id', 'amount'))
+        ingredients = [
+            {'id': item.ingredient_id, 'amount': item.amount}
+            for item in recipe.ingredient_list.order_by('id')
+        ]
+        ingredients[0]['amount'] += 100
+        self.client.get('/api/tags/')
+        with self.assertNumQueries(self.UPDATE_QUERIES) as context:
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/',
+                {'ingredients': ingredients, 'tags': [self.tags[0].id]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if 'recipes_ingredientinrecipe' in query['sql']
+            and query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('UPDATE'))
+        updated = dict(recipe.ingredient_list.values_list('id', 'amount'))
+        self.assertEqual(updated.keys(), rows.keys())
+        changed = [pk for pk in rows if rows[pk] != updated[pk]]
+        self.assertEqual(len(changed), 1)
+
+
+class ConditionalResponseTest(ApiDataMixin, TestCase):
+    def assert_etag_changes(self, url, change):
+        etag = self.anonymous.get(url)['ETag']
+        self.assertEqual(
+            self.anonymous.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        change()
+        response = self.anonymous.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_load_data_changes_etag(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ingredients = os.path.join(directory, 'ingredients.csv')
+            tags = os.path.join(directory, 'tags.csv')
+            with open(ingredients, 'w', encoding='utf-8') as data_file:
+                data_file.write('Новый ингредиент,г\n')
+            with open(tags, 'w', encoding='utf-8') as data_file:
+                data_file.write('Новый тег,#123456,new\n')
+            for url in ('/api/ingredients/', '/api/tags/'):
+                with self.subTest(url=url):
+                    self.assert_etag_changes(url, partial(
+                        call_command,
+                        'load_data',
+                        ingredients=ingredients,
+                        tags=tags,
+                        stdout=StringIO(),
+                    ))
+
+
+class CounterFieldsTest(ApiDataMixin, TestCase):
+    def test_recipe_update_keeps_counters(self):
+        recipe = self.recipes[0]
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=42)
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=43)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 43)
+
+    def test_profile_update_keeps_counters(self):
+        self.client.get('/api/tags/')
+        User.objects.filter(pk=self.viewer.pk).update(recipes_count=7)
+        response = self.client.patch(
+            '/api/users/me/', {'first_name': 'Новое имя'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.viewer.refresh_from_db()
+        self.assertEqual(self.viewer.first_name, 'Новое имя')
+        self.assertEqual(self.viewer.recipes_count, 7)
+
+
+class CacheInvalidationTest(ApiDataMixin, TransactionTestCase):
+    def setUp(self):
+        self.setUpTestData()
+        super().setUp()
+
+    def assert_cache(self, urls, status):
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.anonymous.get(url)['X-Cache'], status)
+
+    def assert_invalidates(self, change, stale, fresh):
+        urls = stale + fresh
+        for url in urls:
+            self.anonymous.get(url)
+        self.assert_cache(urls, 'HIT')
+        change()
+        self.assert_cache(stale, 'MISS')
+        self.assert_cache(fresh, 'HIT')
+
+    def test_recipe_change_invalidates_its_tags_and_author(self):
+        recipe = self.recipes[0]
+        recipe.name = 'Новое название'
+        self.assert_invalidates(
+            recipe.save,
+            stale=[
+                '/api/recipes/',
+                f'/api/recipes/?tags={self.tags[0].slug}',
+                f'/api/recipes/?author={self.authors[0].id}',
+                f'/api/recipes/{recipe.id}/',
+            ],
+            fresh=[
+                f'/api/recipes/?tags={self.tags[1].slug}',
+                f'/api/recipes/?author={self.authors[1].id}',
+                f'/api/recipes/{self.recipes[1].id}/',
+            ],
+        )
+
+    def test_added_tag_invalidates_tag_list(self):
+        self.assert_invalidates(
+            partial(self.recipes[0].tags.add, self.tags[2]),
+            stale=[f'/api/recipes/?tags={self.tags[2].slug}'],
+            fresh=[f'/api/recipes/?tags={self.tags[1].slug}'],
+        )
+
+    def test_author_profile_change_invalidates_author_recipes(self):
+        author = self.authors[0]
+        author.first_name = 'Новое имя'
+        self.assert_invalidates(
+            author.save,
+            stale=[
+                f'/api/recipes/?author={author.id}',
+                f'/api/recipes/{self.recipes[0].id}/',
+            ],
+            fresh=[f'/api/recipes/{self.recipes[1].id}/'],
+        )
+
+    def test_tag_change_invalidates_all_recipes(self):
+        tag = self.tags[2]
+        tag.name = 'Новый тег'
+        self.assert_invalidates(
+            tag.save,
+            stale=[
+                f'/api/recipes/?tags={self.tags[0].slug}',
+                f'/api/recipes/{self.recipes[1].id}/',
+            ],
+            fresh=[],
+        )
+
+
+class RequestSizeTest(ApiDataMixin, TestCase):
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_oversized_json_is_rejected_before_parsing(self):
+        response = self.client.post(
+            '/api/recipes/',
+            {'name': 'Рецепт', 'text': 'x' * 2048},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 413)
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.action = None
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.view = None
+        self.view_started = None
+        self.render_started = None
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def end_view(self):
+        if self.view is None and self.view_started is not None:
+            self.view = time.perf_counter() - self.view_started
+
+    def metrics(self):
+        total = time.perf_counter() - self.started
+        return {
+            'db': self.db,
+            'serialize': self.serialize,
+            'render': self.render,
+            'view': self.view or 0.0,
+            'total': total,
+        }
+
+    def header(self):
+        parts = []
+        for name, seconds in self.metrics().items():
+            part = f'{name};dur={seconds * 1000:.2f}'
+            if name == 'db':
+                part += f';desc="{self.queries} queries"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+def view_action(view_func):
+    initkwargs = getattr(view_func, 'initkwargs', None) or {}
+    actions = getattr(view_func, 'actions', None) or {}
+    basename = initkwargs.get('basename')
+    view_class = getattr(view_func, 'cls', None)
+    name = basename or (view_class or view_func).__name__
+    return name, actions
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        timings = current()
+        if timings is None or timings.serializer_depth:
+            return super().to_representation(instance)
+        timings.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serialize += time.perf_counter() - started
+            timings.serializer_depth -= 1
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        if not (settings.SERVER_TIMING or settings.SERVER_TIMING_LOG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = Timings()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+            timings.end_view()
+            if settings.SERVER_TIMING:
+                response['Server-Timing'] = timings.header()
+            if settings.SERVER_TIMING_LOG:
+                self.log(request, response, timings)
+            return response
+        finally:
+            _local.timings = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current()
+        name, actions = view_action(view_func)
+        action = actions.get(request.method.lower())
+        timings.action = f'{name}.{action}' if action else name
+        timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = current()
+        timings.end_view()
+        timings.render_started = time.perf_counter()
+        response.add_post_render_callback(self.rendered)
+        return response
+
+    def rendered(self, response):
+        timings = current()
+        if timings is not None and timings.render_started is not None:
+            timings.render = time.perf_counter() - timings.render_started
+
+    def log(self, request, response, timings):
+        record = {
+            'action': timings.action,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings.queries,
+        }
+        record.update(
+            (f'{name}_ms', round(seconds * 1000, 2))
+            for name, seconds in timings.metrics().items()
+        )
+        logger.info(json.dumps(record), extra={'timing': record})
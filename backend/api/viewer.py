@@ -0,0 +1,33 @@
+from django.utils.functional import cached_property
+
+
+class Viewer:
+    def __init__(self, user):
+        self.user = user
+
+    def _ids(self, related_name, field):
+        if self.user.is_anonymous:
+            return frozenset()
+        queryset = getattr(self.user, related_name).values_list(
+            field, flat=True
+        )
+        return frozenset(queryset)
+
+    @cached_property
+    def favorite_ids(self):
+        return self._ids('favorites', 'recipe_id')
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self._ids('shopping_cart', 'recipe_id')
+
+    @cached_property
+    def subscription_ids(self):
+        return self._ids('subscriber', 'author_id')
+
+
+def get_viewer(request):
+    viewer = getattr(request, '_viewer', None)
+    if viewer is None:
+        viewer = request._viewer = Viewer(request.user)
+    return viewer
@@ -1,33 +1,46 @@
-from datetime import datetime
+from functools import partial
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.status import HTTP_400_BAD_REQUEST
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from api.pagination import CustomPagination
-from api.serializers import SubscribeSerializer, UserSerializer
-from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+from api.serializers import (SubscribeSerializer, UserSerializer,
+                             get_recipes_limit)
+from recipes import counters, shopping_list
+from recipes.autocomplete import ingredient_index
+from recipes.models import (Favourite, Ingredient, Recipe, ShoppingCart,
+                            Tag)
 from users.models import Subscribe
 
-from .filters import IngredientFilter, RecipeFilter
+from . import caching
+from .exporters import (SHOPPING_LIST_EXPORTERS, ShoppingListExporter,
+                        TextExporter)
+from .filters import RecipeFilter
 from .permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeReadSerializer,
-                          RecipeShortSerializer, RecipeWriteSerializer,
-                          TagSerializer)
+from .serializers import (IngredientSerializer, RecipeIdsSerializer,
+                          RecipeReadSerializer, RecipeShortSerializer,
+                          RecipeWriteSerializer, TagSerializer)
 
 User = get_user_model()
 
 
+def lock_user(user):
+    User.objects.select_for_update().filter(pk=user.pk).exists()
+
+
 class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -41,21 +54,38 @@ class UserViewSet(UserViewSet):
     def subscribe(self, request, **kwargs):
         user = request.user
         author_id = self.kwargs.get('id')
-        author = get_object_or_404(User, id=author_id)
 
         if request.method == 'POST':
+            author = get_object_or_404(User, id=author_id)
             serializer = SubscribeSerializer(
                 author, data=request.data, context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            Subscribe.objects.create(user=user, author=author)
+            try:
+                with transaction.atomic():
+                    Subscribe.objects.create(user=user, author=author)
+                    counters.change_user(author.id, 'subscribers_count', 1)
+            except IntegrityError:
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Подписка уже существует'
+                    ]
+                })
+            caching.invalidate_viewer(user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            subscription = get_object_or_404(
-                Subscribe, user=user, author=author
-            )
-            subscription.delete()
+            with transaction.atomic():
+                deleted, _ = Subscribe.objects.filter(
+                    user=user, author_id=author_id
+                ).delete()
+                if deleted:
+                    counters.change_user(
+                        author_id, 'subscribers_count', -deleted
+                    )
+            if not deleted:
+                raise Http404
+            caching.invalidate_viewer(user)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, permission_classes=[IsAuthenticated])
@@ -63,6 +93,11 @@ class UserViewSet(UserViewSet):
         user = request.user
         queryset = User.objects.filter(subscribing__user=user)
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.latest_by_author(
+            [author.id for author in pages], get_recipes_limit(request)
+        )
+        for author in pages:
+            author.latest_recipes = recipes.get(author.id, [])
         serializer = SubscribeSerializer(
             pages, many=True, context={'request': request}
         )
@@ -73,11 +108,28 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = CustomPagination
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return caching.conditional_response(
+            request,
+            partial(self.search, request, *args, **kwargs),
+            (caching.INGREDIENTS,),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return caching.conditional_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            (caching.INGREDIENTS,),
+        )
+
+    def search(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
 
 class TagViewSet(ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
@@ -85,6 +137,20 @@ class TagViewSet(ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return caching.conditional_response(
+            request,
+            partial(super().list, request, *args, **kwargs),
+            (caching.TAGS,),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return caching.conditional_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            (caching.TAGS,),
+        )
+
 
 class RecipeViewSet(ModelViewSet):
     queryset = Recipe.objects.all()
@@ -94,6 +160,48 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.with_related()
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        view = partial(super().list, request, *args, **kwargs)
+        if request.user.is_anonymous:
+            view = partial(
+                caching.cached_response,
+                partial(caching.list_key, request),
+                view,
+            )
+        return caching.conditional_response(
+            request, view, caching.list_scopes(request), per_viewer=True
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        view = partial(super().retrieve, request, *args, **kwargs)
+        try:
+            updated = Recipe.objects.filter(pk=pk).values_list(
+                'updated', flat=True
+            ).first()
+        except ValueError:
+            updated = None
+        if updated is None:
+            return view()
+        if request.user.is_anonymous:
+            view = partial(
+                caching.cached_response,
+                partial(caching.detail_key, request, pk),
+                view,
+            )
+        return caching.conditional_response(
+            request,
+            view,
+            caching.detail_scopes(pk),
+            modified=updated.timestamp(),
+            per_viewer=True,
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -123,60 +231,151 @@ class RecipeViewSet(ModelViewSet):
         else:
             return self.delete_from(ShoppingCart, request.user, pk)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_favorite(self, request):
+        return self.bulk_change(Favourite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_change(ShoppingCart, request)
+
+    def bulk_change(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            results = self.bulk_add_to(model, request.user, ids)
+        else:
+            results = self.bulk_delete_from(model, request.user, ids)
+        return Response({
+            'results': [
+                {'id': pk, 'status': result}
+                for pk, result in zip(ids, results)
+            ]
+        })
+
+    def bulk_add_to(self, model, user, ids):
+        with transaction.atomic():
+            lock_user(user)
+            found = set(
+                Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+            )
+            existing = set(
+                model.objects.filter(
+                    user=user, recipe_id__in=found
+                ).values_list('recipe_id', flat=True)
+            )
+            added = [pk for pk in ids if pk in found - existing]
+            if added:
+                model.objects.bulk_create(
+                    [model(user=user, recipe_id=pk) for pk in added],
+                    ignore_conflicts=True,
+                )
+                counters.change_recipes(model, added, 1)
+                if model is ShoppingCart:
+                    shopping_list.add_recipes(user, added)
+                caching.invalidate_viewer(user)
+        return [
+            'not_found' if pk not in found
+            else 'exists' if pk in existing
+            else 'added'
+            for pk in ids
+        ]
+
+    def bulk_delete_from(self, model, user, ids):
+        with transaction.atomic():
+            lock_user(user)
+            present = set(
+                model.objects.filter(
+                    user=user, recipe_id__in=ids
+                ).values_list('recipe_id', flat=True)
+            )
+            if present:
+                model.objects.filter(
+                    user=user, recipe_id__in=present
+                ).delete()
+                counters.change_recipes(model, present, -1)
+                if model is ShoppingCart:
+                    shopping_list.remove_recipes(user, present)
+                caching.invalidate_viewer(user)
+        return ['removed' if pk in present else 'missing' for pk in ids]
+
     def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            with transaction.atomic():
+                model.objects.create(user=user, recipe=recipe)
+                counters.change_recipes(model, (recipe.id,), 1)
+                if model is ShoppingCart:
+                    shopping_list.add_recipes(user, [recipe.id])
+        except IntegrityError:
             return Response(
                 {'errors': 'Рецепт добавлен'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
-        serializer = RecipeShortSerializer(recipe)
+        caching.invalidate_viewer(user)
+        serializer = RecipeShortSerializer(
+            recipe, context={'request': self.request}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(
+                user=user, recipe_id=pk
+            ).delete()
+            if deleted:
+                counters.change_recipes(model, (pk,), -deleted)
+            if deleted and model is ShoppingCart:
+                shopping_list.remove_recipes(user, [pk])
+        if deleted:
+            caching.invalidate_viewer(user)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Рецепт удален'},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(caching.stats())
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=(
+            SHOPPING_LIST_EXPORTERS
+            + tuple(api_settings.DEFAULT_RENDERER_CLASSES)
+        ),
+    )
     def download_shopping_cart(self, request):
         user = request.user
         if not user.shopping_cart.exists():
             return Response(status=HTTP_400_BAD_REQUEST)
 
-        ingredients = (
-            IngredientInRecipe.objects.filter(
-                recipe__shopping_cart__user=request.user
-            )
-            .values(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            )
-            .annotate(amount=Sum('amount')).order_by()
-        )
+        ingredients = user.shopping_list.values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount',
+        ).order_by('ingredient__name')
 
-        today = datetime.today()
-        shopping_list = (
-            f'Список покупок для: {user.get_full_name()}\n\n'
-            f'Дата: {today.day}.{today.month}.{today.year}. \n\n'
+        exporter = request.accepted_renderer
+        if not isinstance(exporter, ShoppingListExporter):
+            exporter = TextExporter()
+        response = StreamingHttpResponse(
+            exporter.stream(user, ingredients.iterator()),
+            content_type=exporter.media_type,
         )
-        shopping_list += '\n'.join(
-            [
-                f'- {ingredient["ingredient__name"]}: '
-                f' {ingredient["amount"]}'
-                f' {ingredient["ingredient__measurement_unit"]}.'
-                for ingredient in ingredients
-            ]
+        response['Content-Disposition'] = (
+            f'attachment; filename={exporter.filename(user)}'
         )
 
-        filename = f'{user.username}_shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
-
         return response
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from functools import partial
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, timeout, check_after):
+        self.connect = connect
+        self.slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+        self.check_after = check_after
+        self.idle = []
+        self.lock = threading.Lock()
+        self.opened = 0
+
+    def is_usable(self, connection, released):
+        if connection.closed:
+            return False
+        if time.monotonic() - released < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def take_idle(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, released = self.idle.pop()
+            if self.is_usable(connection, released):
+                return connection
+            self.discard(connection)
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'No free database connection after {self.timeout}s'
+            )
+        try:
+            connection = self.take_idle()
+            if connection is None:
+                connection = self.connect()
+                with self.lock:
+                    self.opened += 1
+        except Exception:
+            self.slots.release()
+            raise
+        return connection
+
+    def put(self, connection):
+        try:
+            close = bool(connection.closed)
+            if not close and connection.get_transaction_status() != (
+                extensions.TRANSACTION_STATUS_IDLE
+            ):
+                try:
+                    connection.rollback()
+                except Database.Error:
+                    close = True
+            if close:
+                self.discard(connection)
+            else:
+                with self.lock:
+                    self.idle.append((connection, time.monotonic()))
+        finally:
+            self.slots.release()
+
+
+def get_pool(alias, conn_params, options):
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                partial(Database.connect, **conn_params),
+                options.get('SIZE', 10),
+                options.get('TIMEOUT', 30),
+                options.get('CHECK_AFTER', 30),
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            self.get_connection_params(),
+            self.settings_dict.get('POOL', {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.get()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -63,19 +65,55 @@ TEMPLATES = [
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
 
+DB_ENGINE = os.getenv("DB_ENGINE", default="django.db.backends.sqlite3")
+DB_POOL = os.getenv("DB_POOL", default="false").lower() == "true"
+if DB_POOL and DB_ENGINE.startswith("django.db.backends.postgresql"):
+    DB_ENGINE = "foodgram.pool"
+DB_OPTIONS = {}
+if DB_ENGINE != "django.db.backends.sqlite3":
+    DB_OPTIONS["connect_timeout"] = int(
+        os.getenv("DB_CONNECT_TIMEOUT", default=10)
+    )
+
 DATABASES = {
     "default": {
-        "ENGINE": os.getenv(
-            "DB_ENGINE", default="django.db.backends.sqlite3"
-        ),
+        "ENGINE": DB_ENGINE,
         "NAME": os.getenv("DB_NAME", default=os.path.join(BASE_DIR, "db.sqlite3")),
         "USER": os.getenv("POSTGRES_USER", default="default"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", default="default"),
         "HOST": os.getenv("DB_HOST", default="default"),
         "PORT": os.getenv("DB_PORT", default="default"),
+        "OPTIONS": DB_OPTIONS,
+        "CONN_MAX_AGE": (
+            0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", default=60))
+        ),
+        "POOL": {
+            "SIZE": int(os.getenv("DB_POOL_SIZE", default=10)),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", default=30)),
+            "CHECK_AFTER": float(os.getenv("DB_POOL_CHECK_AFTER", default=30)),
+        },
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default=""),
+    }
+}
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", default=300))
+
+PAGINATION_COUNT_TIMEOUT = int(
+    os.getenv("PAGINATION_COUNT_TIMEOUT", default=60)
+)
+PAGINATION_ESTIMATE_FROM = int(
+    os.getenv("PAGINATION_ESTIMATE_FROM", default=10000)
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,12 +134,18 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.LimitedJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
 }
 
 DJOSER = {
     "SERIALIZERS": {
+        "token_create": "api.serializers.TokenCreateSerializer",
         "user_create": "api.serializers.UserCreateSerializer",
         "user": "api.serializers.UserSerializer",
         "current_user": "api.serializers.UserSerializer",
@@ -130,3 +174,69 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+SHOPPING_LIST_FONT = os.getenv(
+    "SHOPPING_LIST_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+INGREDIENT_INDEX_TTL = int(os.getenv("INGREDIENT_INDEX_TTL", default=300))
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(
+    os.getenv("INGREDIENT_AUTOCOMPLETE_LIMIT", default=50)
+)
+
+RECIPE_THUMBNAIL_SIZES = {
+    "small": (320, 320),
+    "medium": (640, 640),
+}
+RECIPE_THUMBNAIL_FORMAT = os.getenv("RECIPE_THUMBNAIL_FORMAT", default="WEBP")
+RECIPE_THUMBNAIL_QUALITY = int(
+    os.getenv("RECIPE_THUMBNAIL_QUALITY", default=80)
+)
+
+RECIPE_IMAGE_ASYNC = (
+    os.getenv("RECIPE_IMAGE_ASYNC", default="false").lower() == "true"
+)
+RECIPE_IMAGE_WORKERS = int(os.getenv("RECIPE_IMAGE_WORKERS", default=2))
+RECIPE_IMAGE_UPLOAD_DIR = os.getenv(
+    "RECIPE_IMAGE_UPLOAD_DIR", default=os.path.join(BASE_DIR, "uploads")
+)
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv("RECIPE_IMAGE_MAX_SIZE", default=10 * 1024 * 1024)
+)
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", default=10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", default=60))
+TOKEN_CACHE_SHARED = (
+    os.getenv("TOKEN_CACHE_SHARED", default="false").lower() == "true"
+)
+TOKEN_CACHE_SHARED_TTL = int(
+    os.getenv("TOKEN_CACHE_SHARED_TTL", default=300)
+)
+TOKEN_TTL = int(os.getenv("TOKEN_TTL")) if os.getenv("TOKEN_TTL") else None
+
+RECIPE_SEARCH_CONFIG = os.getenv("RECIPE_SEARCH_CONFIG", default="russian")
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", default="false").lower() == "true"
+SERVER_TIMING_LOG = (
+    os.getenv("SERVER_TIMING_LOG", default="false").lower() == "true"
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+BULK_RECIPES_LIMIT = int(os.getenv("BULK_RECIPES_LIMIT", default=100))
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+
+from recipes import counters, shopping_list
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def create_user(username, **kwargs):
+    kwargs.setdefault('first_name', 'Пользователь')
+    kwargs.setdefault('last_name', username)
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        password='password',
+        **kwargs,
+    )
+
+
+def create_recipe(author, tags, ingredients, name='Рецепт'):
+    recipe = Recipe.objects.create(
+        name=name,
+        author=author,
+        text='Описание',
+        image='recipes/images/recipe.png',
+        cooking_time=10,
+    )
+    recipe.tags.set(tags)
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(
+            recipe=recipe, ingredient=ingredient, amount=number + 1
+        )
+        for number, ingredient in enumerate(ingredients)
+    )
+    return recipe
+
+
+class RecipeDataMixin:
+    AUTHOR_COUNT = 5
+    TAG_COUNT = 3
+    INGREDIENT_COUNT = 40
+    RECIPE_COUNT = 25
+    RECIPE_INGREDIENTS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.authors = [
+            create_user(f'author{number}')
+            for number in range(cls.AUTHOR_COUNT)
+        ]
+        cls.viewer = create_user('viewer')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}',
+                color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(cls.TAG_COUNT)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(cls.INGREDIENT_COUNT)
+        ]
+        cls.recipes = [
+            create_recipe(
+                cls.authors[number % cls.AUTHOR_COUNT],
+                cls.tags[:number % cls.TAG_COUNT + 1],
+                [
+                    cls.ingredients[(number + offset) % cls.INGREDIENT_COUNT]
+                    for offset in range(cls.RECIPE_INGREDIENTS)
+                ],
+                name=f'Рецепт {number}',
+            )
+            for number in range(cls.RECIPE_COUNT)
+        ]
+        Favourite.objects.bulk_create(
+            Favourite(user=cls.viewer, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.viewer, recipe=recipe)
+            for recipe in cls.recipes[::3]
+        )
+        Subscribe.objects.create(user=cls.viewer, author=cls.authors[0])
+        cls.token = Token.objects.create(user=cls.viewer)
+        shopping_list.rebuild()
+        counters.reconcile()
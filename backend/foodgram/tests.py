@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+from psycopg2 import OperationalError, extensions
+
+from foodgram.pool.base import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.connections = []
+        self.pool = ConnectionPool(
+            self.connect, size=2, timeout=0.1, check_after=30
+        )
+
+    def connect(self):
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return connection
+
+    def test_returned_connection_is_reused(self):
+        connection = self.pool.get()
+        self.pool.put(connection)
+        self.assertIs(self.pool.get(), connection)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_open_transaction_is_rolled_back(self):
+        connection = self.pool.get()
+        connection.status = extensions.TRANSACTION_STATUS_INTRANS
+        self.pool.put(connection)
+        self.assertIs(self.pool.get(), connection)
+        self.assertEqual(
+            connection.status, extensions.TRANSACTION_STATUS_IDLE
+        )
+
+    def test_closed_connection_is_replaced(self):
+        connection = self.pool.get()
+        connection.closed = 1
+        self.pool.put(connection)
+        self.assertIsNot(self.pool.get(), connection)
+        self.assertEqual(len(self.connections), 2)
+
+    def test_size_limits_checked_out_connections(self):
+        self.pool.get()
+        self.pool.get()
+        with self.assertRaises(OperationalError):
+            self.pool.get()
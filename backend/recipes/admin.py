@@ -1,7 +1,8 @@
 from django.contrib import admin
 
+from . import counters, shopping_list
 from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, Tag)
 
 
 class IngredientInline(admin.TabularInline):
@@ -9,16 +10,41 @@ class IngredientInline(admin.TabularInline):
     extra = 3
 
 
+class ShoppingListAdminMixin:
+    def get_changed_recipes(self, form, formsets):
+        return {
+            inline.cleaned_data['recipe'].pk
+            for formset in formsets
+            for inline in formset.forms
+            if getattr(inline, 'cleaned_data', None)
+            and inline.cleaned_data.get('recipe')
+        }
+
+    def save_related(self, request, form, formsets, change):
+        recipe_ids = self.get_changed_recipes(form, formsets)
+        old_amounts = shopping_list.amounts_by_recipe(recipe_ids)
+        super().save_related(request, form, formsets, change)
+        shopping_list.sync_recipes(recipe_ids, old_amounts)
+
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('author', 'name', 'cooking_time')
+class RecipeAdmin(ShoppingListAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'author', 'name', 'cooking_time', 'favorites_count', 'updated'
+    )
+    readonly_fields = (
+        'created', 'updated', 'favorites_count', 'shopping_cart_count'
+    )
     search_fields = ('name', 'author', 'tags')
     list_filter = ('author', 'name', 'tags')
     inlines = (IngredientInline,)
 
+    def get_changed_recipes(self, form, formsets):
+        return {form.instance.pk}
+
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ShoppingListAdminMixin, admin.ModelAdmin):
     inlines = (IngredientInline,)
     list_display = (
         'name',
@@ -26,6 +52,13 @@ class IngredientAdmin(admin.ModelAdmin):
     )
     list_filter = ('name',)
 
+    def get_changed_recipes(self, form, formsets):
+        return super().get_changed_recipes(form, formsets) | set(
+            IngredientInRecipe.objects.filter(
+                ingredient=form.instance
+            ).values_list('recipe_id', flat=True)
+        )
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -36,17 +69,64 @@ class TagAdmin(admin.ModelAdmin):
     )
 
 
-@admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class RecipeRowsAdmin(admin.ModelAdmin):
     list_display = (
         'user',
         'recipe',
     )
 
+    def rows_added(self, rows):
+        counters.change_recipe_rows(
+            self.model, [recipe_id for _, recipe_id in rows], 1
+        )
+
+    def rows_removed(self, rows):
+        counters.change_recipe_rows(
+            self.model, [recipe_id for _, recipe_id in rows], -1
+        )
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            self.rows_removed(list(
+                self.model.objects.filter(pk=obj.pk).values_list(
+                    'user_id', 'recipe_id'
+                )
+            ))
+        super().save_model(request, obj, form, change)
+        self.rows_added([(obj.user_id, obj.recipe_id)])
+
+    def delete_model(self, request, obj):
+        self.rows_removed([(obj.user_id, obj.recipe_id)])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self.rows_removed(list(queryset.values_list('user_id', 'recipe_id')))
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(ShoppingCart)
+class ShoppingCartAdmin(RecipeRowsAdmin):
+    def rows_added(self, rows):
+        super().rows_added(rows)
+        for user_id, recipe_id in rows:
+            shopping_list.apply_deltas(
+                [user_id], shopping_list.recipe_amounts([recipe_id])
+            )
+
+    def rows_removed(self, rows):
+        super().rows_removed(rows)
+        shopping_list.remove_cart_rows(rows)
+
 
 @admin.register(Favourite)
-class FavouriteAdmin(admin.ModelAdmin):
+class FavouriteAdmin(RecipeRowsAdmin):
+    pass
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
     list_display = (
         'user',
-        'recipe',
+        'ingredient',
+        'amount',
     )
@@ -0,0 +1,79 @@
+import bisect
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Ingredient
+
+VERSION_KEY = 'recipes:ingredient_index:version'
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        self._snapshot = None
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    def _version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(VERSION_KEY, version, None):
+                version = cache.get(VERSION_KEY, version)
+        return version
+
+    def _build(self, version):
+        rows = Ingredient.objects.values(
+            'id', 'name', 'measurement_unit'
+        ).order_by().iterator()
+        entries = sorted(
+            (row['name'].lower(), row['id'], row) for row in rows
+        )
+        keys = [key for key, _, _ in entries]
+        items = [row for _, _, row in entries]
+        return keys, items, time.monotonic(), version
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        version = self._version()
+        if (
+            snapshot is None
+            or snapshot[3] != version
+            or time.monotonic() - snapshot[2] > settings.INGREDIENT_INDEX_TTL
+        ):
+            with self._lock:
+                if self._snapshot is snapshot:
+                    self._snapshot = self._build(version)
+                snapshot = self._snapshot
+        return snapshot
+
+    def search(self, query, limit=None):
+        if limit is None:
+            limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        query = query.strip().lower()
+        keys, items, _, _ = self._get_snapshot()
+        result = []
+        position = bisect.bisect_left(keys, query)
+        while (
+            position < len(keys)
+            and len(result) < limit
+            and keys[position].startswith(query)
+        ):
+            result.append(items[position])
+            position += 1
+        if len(result) < limit:
+            for key, item in zip(keys, items):
+                if query in key and not key.startswith(query):
+                    result.append(item)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,23 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+
+class CommitBatch:
+    def __init__(self, flush):
+        self.flush = flush
+        self._local = threading.local()
+
+    def add(self, **values):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = defaultdict(set)
+        for name, items in values.items():
+            pending[name].update(items)
+        transaction.on_commit(self._flush)
+
+    def _flush(self):
+        pending = self._local.__dict__.pop('pending', None)
+        if pending:
+            self.flush(**pending)
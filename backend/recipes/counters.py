@@ -0,0 +1,103 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscribe
+
+from .models import Favourite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+RECIPE_COUNTERS = {
+    Favourite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+COUNTERS = (
+    (Recipe, 'favorites_count', Favourite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+)
+
+
+def change(model, ids, field, delta):
+    queryset = model.objects.filter(pk__in=ids)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_recipes(model, recipe_ids, delta):
+    return change(Recipe, recipe_ids, RECIPE_COUNTERS[model], delta)
+
+
+def change_user(user_id, field, delta):
+    return change(User, (user_id,), field, delta)
+
+
+def change_rows(model, ids, field, delta):
+    groups = defaultdict(list)
+    for pk, count in Counter(ids).items():
+        groups[count].append(pk)
+    for count, pks in groups.items():
+        change(model, pks, field, delta * count)
+
+
+def change_recipe_rows(model, recipe_ids, delta):
+    change_rows(Recipe, recipe_ids, RECIPE_COUNTERS[model], delta)
+
+
+def delete_user(user):
+    for model in RECIPE_COUNTERS:
+        change_recipes(
+            model,
+            model.objects.filter(user=user).exclude(
+                recipe__author=user
+            ).values_list('recipe_id', flat=True),
+            -1,
+        )
+    change(
+        User,
+        Subscribe.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        ),
+        'subscribers_count',
+        -1,
+    )
+
+
+def actual(source, lookup):
+    rows = source.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(
+            rows.values(lookup).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def stale(model, field, source, lookup):
+    return model.objects.annotate(
+        actual_count=actual(source, lookup)
+    ).exclude(**{field: F('actual_count')})
+
+
+def verify():
+    return {
+        f'{model._meta.model_name}.{field}': stale(
+            model, field, source, lookup
+        ).count()
+        for model, field, source, lookup in COUNTERS
+    }
+
+
+def reconcile():
+    fixed = {}
+    for model, field, source, lookup in COUNTERS:
+        label = f'{model._meta.model_name}.{field}'
+        fixed[label] = stale(model, field, source, lookup).count()
+        if fixed[label]:
+            model.objects.update(**{field: actual(source, lookup)})
+    return fixed
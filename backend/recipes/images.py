@@ -0,0 +1,104 @@
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail_name(name, size):
+    directory, filename = posixpath.split(name)
+    base, _ = posixpath.splitext(filename)
+    extension = settings.RECIPE_THUMBNAIL_FORMAT.lower()
+    return posixpath.join(
+        directory, 'thumbnails', size, f'{base}.{extension}'
+    )
+
+
+def thumbnail_urls(recipe, request=None):
+    image = recipe.image
+    if not image:
+        return None
+    ready = recipe.thumbnails_image == image.name
+    urls = {}
+    for size in settings.RECIPE_THUMBNAIL_SIZES:
+        name = thumbnail_name(image.name, size) if ready else image.name
+        url = image.storage.url(name)
+        urls[size] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def render_thumbnail(picture, dimensions):
+    thumbnail = picture.copy()
+    thumbnail.thumbnail(dimensions, Image.LANCZOS)
+    if thumbnail.mode not in ('RGB', 'RGBA'):
+        thumbnail = thumbnail.convert('RGBA')
+    if settings.RECIPE_THUMBNAIL_FORMAT == 'JPEG':
+        thumbnail = thumbnail.convert('RGB')
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer,
+        format=settings.RECIPE_THUMBNAIL_FORMAT,
+        quality=settings.RECIPE_THUMBNAIL_QUALITY,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def generate_thumbnails(image, force=False):
+    if not image:
+        return 0
+    storage = image.storage
+    missing = {
+        size: thumbnail_name(image.name, size)
+        for size in settings.RECIPE_THUMBNAIL_SIZES
+        if force or not storage.exists(thumbnail_name(image.name, size))
+    }
+    if not missing:
+        return 0
+    try:
+        with storage.open(image.name, 'rb') as source:
+            picture = Image.open(source)
+            picture.load()
+        picture = ImageOps.exif_transpose(picture)
+    except (OSError, ValueError) as error:
+        logger.warning('Cannot read recipe image %s: %s', image.name, error)
+        return 0
+    generated = 0
+    for size, name in missing.items():
+        try:
+            content = render_thumbnail(
+                picture, settings.RECIPE_THUMBNAIL_SIZES[size]
+            )
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, content)
+        except Exception:
+            logger.exception(
+                'Cannot save %s thumbnail for %s', size, image.name
+            )
+            continue
+        generated += 1
+    return generated
+
+
+def thumbnails_exist(image):
+    return all(
+        image.storage.exists(thumbnail_name(image.name, size))
+        for size in settings.RECIPE_THUMBNAIL_SIZES
+    )
+
+
+def refresh_thumbnails(recipe_id, image, force=False):
+    generated = generate_thumbnails(image, force)
+    if not image or not thumbnails_exist(image):
+        return generated
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image.name).first()
+    if recipe is not None and recipe.thumbnails_image != image.name:
+        recipe.thumbnails_image = image.name
+        recipe.save(update_fields=('thumbnails_image', 'updated'))
+    return generated
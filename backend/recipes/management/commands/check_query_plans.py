@@ -0,0 +1,136 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def postgres_seq_scans(plan):
+    scans = []
+    if plan.get('Node Type') == 'Seq Scan':
+        scans.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        scans.extend(postgres_seq_scans(child))
+    return scans
+
+
+def sqlite_seq_scans(rows):
+    scans = []
+    for row in rows:
+        words = row[-1].split()
+        if words[0] == 'SCAN' and 'USING' not in words:
+            scans.append(words[2] if words[1] == 'TABLE' else words[1])
+    return scans
+
+
+class Command(BaseCommand):
+    help = 'Fail if hot queries fall back to sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--planner-costs',
+            action='store_true',
+            help='Keep sequential scans enabled on PostgreSQL, '
+                 'meaningful only on a seeded database',
+        )
+
+    def get_checks(self):
+        user_id = User.objects.values_list('id', flat=True).first() or 1
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:10])
+        tag = Tag.objects.values_list('slug', flat=True).first() or 'tag'
+        return (
+            (
+                'recipes by author',
+                Recipe.objects.filter(author_id=user_id).order_by('-id')[:10],
+                'recipes_recipe',
+            ),
+            (
+                'recipes by tag',
+                Recipe.objects.filter(tags__slug=tag),
+                'recipes_recipe_tags',
+            ),
+            (
+                'favorite ids',
+                Favourite.objects.filter(user_id=user_id).values('recipe_id'),
+                'recipes_favourite',
+            ),
+            (
+                'shopping cart ids',
+                ShoppingCart.objects.filter(user_id=user_id).values(
+                    'recipe_id'
+                ),
+                'recipes_shoppingcart',
+            ),
+            (
+                'subscriptions',
+                Subscribe.objects.filter(user_id=user_id).values('author_id'),
+                'users_subscribe',
+            ),
+            (
+                'recipe ingredients',
+                IngredientInRecipe.objects.filter(
+                    recipe_id__in=recipe_ids or [0]
+                ).values('ingredient_id', 'amount'),
+                'recipes_ingredientinrecipe',
+            ),
+            (
+                'shopping list',
+                ShoppingListItem.objects.filter(user_id=user_id).values(
+                    'ingredient_id', 'amount'
+                ),
+                'recipes_shoppinglistitem',
+            ),
+            (
+                'ingredient prefix',
+                Ingredient.objects.filter(name__istartswith='соль'),
+                'recipes_ingredient',
+            ),
+        )
+
+    def seq_scans(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return postgres_seq_scans(plan[0]['Plan'])
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return sqlite_seq_scans(cursor.fetchall())
+        raise CommandError(f'Unsupported database: {connection.vendor}')
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not (
+                options['planner_costs']
+            ):
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for label, queryset, table in self.get_checks():
+                if connection.vendor == 'sqlite' and table == (
+                    'recipes_ingredient'
+                ):
+                    continue
+                scans = self.seq_scans(queryset)
+                if table in scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(
+                        f'{label}: sequential scan on {table}'
+                    ))
+                else:
+                    self.stdout.write(f'{label}: ok')
+        if failures:
+            raise CommandError(
+                f'Sequential scans in {len(failures)} queries: '
+                + ', '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes'))
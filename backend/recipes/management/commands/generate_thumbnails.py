@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import refresh_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for existing recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate thumbnails that already exist',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id', 'image')
+        created = 0
+        for recipe in recipes.iterator():
+            created += refresh_thumbnails(
+                recipe.pk, recipe.image, options['force']
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Thumbnails generated: {created}')
+        )
@@ -1,27 +1,142 @@
+import csv
 import json
 import os
+import time
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
+from api import caching
+from recipes.autocomplete import ingredient_index
 from recipes.models import Ingredient, Tag
 
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+READ_SIZE = 64 * 1024
+JSON_SEPARATORS = ' \t\r\n,[]'
+
+
+def read_json(data_file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    for chunk in iter(lambda: data_file.read(READ_SIZE), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while (
+                position < len(buffer)
+                and buffer[position] in JSON_SEPARATORS
+            ):
+                position += 1
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break
+            yield item
+        buffer = buffer[position:]
+    if buffer.strip(JSON_SEPARATORS):
+        raise CommandError(f'Unexpected end of JSON data: {buffer[:50]}')
+
+
+def read_csv(data_file, fields):
+    for row in csv.reader(data_file):
+        if row:
+            yield dict(zip(fields, row))
+
 
 class Command(BaseCommand):
     help = 'Upload data to Ingredients model'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(DATA_DIR, 'ingredients.json'),
+            help='Path to a .json or .csv file with ingredients',
+        )
+        parser.add_argument(
+            '--tags',
+            default=os.path.join(DATA_DIR, 'tags.json'),
+            help='Path to a .json or .csv file with tags',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows inserted per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Read and count the rows without writing them',
+        )
+
+    def read(self, path, fields):
+        with open(path, encoding='utf-8') as data_file:
+            if path.endswith('.csv'):
+                yield from read_csv(data_file, fields)
+            elif path.endswith('.json'):
+                yield from read_json(data_file)
+            else:
+                raise CommandError(f'Unsupported file format: {path}')
+
+    def load(self, model, path, fields, batch_size, dry_run):
+        self.stdout.write(f'Loading {model._meta.verbose_name_plural} '
+                          f'from {path}')
+        count_before = 0 if dry_run else model.objects.count()
+        started = time.monotonic()
+        processed = 0
+        batch = []
+        for row in self.read(path, fields):
+            batch.append(model(**row))
+            if len(batch) >= batch_size:
+                processed += self.save(model, batch, dry_run)
+                batch = []
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'  {processed} rows, '
+                    f'{processed / max(elapsed, 1e-6):.0f} rows/s'
+                )
+        if batch:
+            processed += self.save(model, batch, dry_run)
+        elapsed = time.monotonic() - started
+        report = f'  {processed} rows read'
+        if not dry_run:
+            created = model.objects.count() - count_before
+            report += f', {created} created, {processed - created} skipped'
+        self.stdout.write(self.style.SUCCESS(
+            f'{report} in {elapsed:.2f}s '
+            f'({processed / max(elapsed, 1e-6):.0f} rows/s)'
+        ))
+
+    def save(self, model, batch, dry_run):
+        if not dry_run:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING('Start command'))
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run, nothing is saved'))
 
-        with open(
-            os.path.abspath('data/ingredients.json')
-        ) as data_file_ingredients:
-            ingredient_data = json.loads(data_file_ingredients.read())
-            for ingredients in ingredient_data:
-                Ingredient.objects.get_or_create(**ingredients)
-
-        with open(os.path.abspath('data/tags.json')) as data_file_tags:
-            tags_data = json.loads(data_file_tags.read())
-            for tags in tags_data:
-                Tag.objects.get_or_create(**tags)
+        self.load(
+            Ingredient,
+            options['ingredients'],
+            ('name', 'measurement_unit'),
+            options['batch_size'],
+            options['dry_run'],
+        )
+        self.load(
+            Tag,
+            options['tags'],
+            ('name', 'color', 'slug'),
+            options['batch_size'],
+            options['dry_run'],
+        )
+        if not options['dry_run']:
+            caching.bump(
+                (caching.NAMESPACE, caching.INGREDIENTS, caching.TAGS)
+            )
+        ingredient_index.invalidate()
 
         self.stdout.write(self.style.SUCCESS('Data is uploaded'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes import uploads
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Process recipe images left in the upload queue'
+
+    def handle(self, *args, **options):
+        recipe_ids = uploads.pending_recipe_ids()
+        for recipe_id in recipe_ids:
+            uploads.process(recipe_id)
+        lost = Recipe.objects.filter(
+            image_status=Recipe.IMAGE_PENDING
+        ).exclude(id__in=uploads.pending_recipe_ids())
+        failed = lost.update(
+            image_status=Recipe.IMAGE_FAILED, updated=timezone.now()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Images processed: {len(recipe_ids)}, lost uploads: {failed}'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import search
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the recipe full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of recipes indexed per query',
+        )
+
+    def handle(self, *args, **options):
+        search.create_index()
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        batch_size = max(options['batch_size'], 1)
+        for start in range(0, len(recipe_ids), batch_size):
+            with transaction.atomic():
+                search.update_index(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recipes indexed: {len(recipe_ids)}'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the aggregated shopping lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare the stored lists with the shopping carts',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            nargs='+',
+            dest='user_ids',
+            help='Limit the command to the given user ids',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not options['verify']:
+            count = shopping_list.rebuild(user_ids)
+            self.stdout.write(
+                self.style.SUCCESS(f'Shopping lists rebuilt: {count} rows')
+            )
+            return
+
+        live = shopping_list.live_totals(user_ids)
+        stored = shopping_list.stored_totals(user_ids)
+        mismatches = [
+            (key, live.get(key), stored.get(key))
+            for key in live.keys() | stored.keys()
+            if live.get(key) != stored.get(key)
+        ]
+        for (user_id, ingredient_id), expected, actual in sorted(
+            mismatches, key=lambda row: row[0]
+        ):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id} '
+                f'expected={expected} stored={actual}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} shopping list rows are out of date, '
+                f'run the command without --verify to rebuild them'
+            )
+        self.stdout.write(self.style.SUCCESS('Shopping lists are up to date'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = 'Repair or verify the favourite, cart and user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report counters that differ from the actual rows',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            stale = {
+                label: count
+                for label, count in counters.verify().items()
+                if count
+            }
+            for label, count in stale.items():
+                self.stdout.write(f'{label}: {count} rows out of date')
+            if stale:
+                raise CommandError(
+                    'Counters are out of date, '
+                    'run the command without --verify to repair them'
+                )
+            self.stdout.write(self.style.SUCCESS('Counters are up to date'))
+            return
+
+        for label, count in counters.reconcile().items():
+            self.stdout.write(f'{label}: {count} rows repaired')
+        self.stdout.write(self.style.SUCCESS('Counters reconciled'))
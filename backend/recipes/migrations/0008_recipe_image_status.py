@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Готово'), ('pending', 'Обрабатывается'), ('failed', 'Ошибка')], default='ready', max_length=16, verbose_name='Статус изображения'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:49
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "SELECT {aggregate} FROM recipes_ingredientinrecipe ir "
+    "JOIN recipes_ingredient i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = r.id"
+)
+POSTGRES_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+POSTGRES_INDEX_NAMES = (
+    'recipe_search_vector_idx',
+    'recipe_name_trgm_idx',
+)
+POSTGRES_BACKFILL = (
+    "UPDATE recipes_recipe r SET search_vector = "
+    "setweight(to_tsvector(%(config)s::regconfig, r.name), 'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(("
+    + INGREDIENT_NAMES.format(aggregate="string_agg(i.name, ' ')")
+    + "), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, r.text), 'C')"
+)
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts '
+    'USING fts5(name, text, ingredients, '
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_BACKFILL = (
+    "INSERT INTO recipes_recipe_fts (rowid, name, text, ingredients) "
+    "SELECT r.id, r.name, r.text, COALESCE(("
+    + INGREDIENT_NAMES.format(aggregate="group_concat(i.name, ' ')")
+    + "), '') FROM recipes_recipe r"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            for statement in POSTGRES_INDEXES:
+                cursor.execute(statement)
+            cursor.execute(
+                POSTGRES_BACKFILL, {'config': settings.RECIPE_SEARCH_CONFIG}
+            )
+        elif vendor == 'sqlite':
+            cursor.execute(SQLITE_CREATE)
+            cursor.execute(SQLITE_BACKFILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            for name in POSTGRES_INDEX_NAMES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        elif vendor == 'sqlite':
+            cursor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
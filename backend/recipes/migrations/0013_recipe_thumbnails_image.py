@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnails_image',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Миниатюры готовы для'),
+        ),
+    ]
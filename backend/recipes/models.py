@@ -4,9 +4,13 @@ from typing import Union
 
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
-from django.db.models import Manager, UniqueConstraint
+from django.db.models import F, Manager, Prefetch, UniqueConstraint, Window
+from django.db.models.functions import RowNumber
+
+from users.mixins import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -63,7 +67,53 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_list',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        recipes = self.filter(author_id__in=author_ids).only(
+            'id', 'name', 'image', 'thumbnails_image', 'cooking_time',
+            'author_id',
+        )
+        if limit is not None:
+            ranked = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=[F('author_id')],
+                    order_by=F('id').desc(),
+                )
+            )
+            sql, params = ranked.query.sql_with_params()
+            recipes = self.model.objects.raw(
+                f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+                'ORDER BY author_id, id DESC',
+                (*params, limit),
+            )
+        grouped = {}
+        for recipe in recipes:
+            grouped.setdefault(recipe.author_id, []).append(recipe)
+        return grouped
+
+
+class Recipe(CounterFieldsMixin, models.Model):
+    IMAGE_READY = 'ready'
+    IMAGE_PENDING = 'pending'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUSES = (
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_PENDING, 'Обрабатывается'),
+        (IMAGE_FAILED, 'Ошибка'),
+    )
+
     name = models.CharField(verbose_name='Наименование', max_length=200, db_index=True,)
 
     author = models.ForeignKey(
@@ -80,6 +130,38 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
     )
 
+    image_status = models.CharField(
+        verbose_name='Статус изображения',
+        max_length=16,
+        choices=IMAGE_STATUSES,
+        default=IMAGE_READY,
+    )
+
+    thumbnails_image = models.CharField(
+        verbose_name='Миниатюры готовы для',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
+
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    created = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True
+    )
+
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True
+    )
+
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок', default=0, editable=False
+    )
+
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
         validators=[
@@ -103,6 +185,10 @@ class Recipe(models.Model):
         related_name='recipes',
     )
 
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
+
     ingredient_list: Union[IngredientInRecipe, Manager]
     favorites: Union[Favourite, Manager]
     shopping_cart: Union[ShoppingCart, Manager]
@@ -111,6 +197,11 @@ class Recipe(models.Model):
         ordering = ('-id',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('author', '-id'), name='recipe_author_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -146,6 +237,12 @@ class IngredientInRecipe(models.Model):
                 name='unique_ingredients_recipe'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'ingredient', 'amount'),
+                name='ingredient_in_recipe_idx',
+            ),
+        )
 
     def __str__(self):
         return (
@@ -209,3 +306,35 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} :: {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+
+    amount = models.IntegerField(verbose_name='Количество', default=0)
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} :: {self.ingredient} - {self.amount}'
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .batches import CommitBatch
+
+FTS_TABLE = 'recipes_recipe_fts'
+INGREDIENT_NAMES = (
+    "SELECT {aggregate} FROM recipes_ingredientinrecipe ir "
+    "JOIN recipes_ingredient i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = r.id"
+)
+POSTGRES_UPDATE = (
+    "UPDATE recipes_recipe r SET search_vector = "
+    "setweight(to_tsvector(%(config)s::regconfig, r.name), 'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(("
+    + INGREDIENT_NAMES.format(aggregate="string_agg(i.name, ' ')")
+    + "), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, r.text), 'C')"
+)
+SQLITE_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients) "
+    "SELECT r.id, r.name, r.text, COALESCE(("
+    + INGREDIENT_NAMES.format(aggregate="group_concat(i.name, ' ')")
+    + "), '') FROM recipes_recipe r"
+)
+
+
+def create_index(using=connection):
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+                'ON recipes_recipe USING gin (search_vector)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+                'ON recipes_recipe USING gin (name gin_trgm_ops)'
+            )
+        elif using.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                'USING fts5(name, text, ingredients, '
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+
+
+def drop_index(using=connection):
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+            cursor.execute('DROP INDEX IF EXISTS recipe_name_trgm_idx')
+        elif using.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def update_index(recipe_ids=None, using=connection):
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            sql = POSTGRES_UPDATE
+            params = {'config': settings.RECIPE_SEARCH_CONFIG}
+            if recipe_ids is not None:
+                sql += ' WHERE r.id = ANY(%(ids)s)'
+                params['ids'] = recipe_ids
+            cursor.execute(sql, params)
+        elif using.vendor == 'sqlite':
+            if recipe_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(SQLITE_INSERT)
+                return
+            placeholders = ', '.join(['%s'] * len(recipe_ids))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids,
+            )
+            cursor.execute(
+                f'{SQLITE_INSERT} WHERE r.id IN ({placeholders})',
+                recipe_ids,
+            )
+
+
+_batch = CommitBatch(update_index)
+
+
+def schedule(recipe_ids):
+    _batch.add(recipe_ids=recipe_ids)
+
+
+def fts_query(value):
+    words = value.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, value):
+    value = value.strip()
+    if not value:
+        return queryset
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=settings.RECIPE_SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).filter(
+            Q(search_vector=query) | Q(name__trigram_similar=value)
+        ).order_by(F('search_rank').desc(nulls_last=True), '-id')
+    if connection.vendor == 'sqlite':
+        query = fts_query(value)
+        if not query:
+            return queryset
+        return queryset.extra(
+            where=(
+                f'recipes_recipe.id IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)',
+            ),
+            params=(query,),
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'AND {FTS_TABLE}.rowid = recipes_recipe.id',
+                (query,),
+            )
+        ).order_by('-search_rank', '-id')
+    return queryset.filter(
+        Q(name__icontains=value) | Q(text__icontains=value)
+    )
@@ -0,0 +1,157 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+BATCH_SIZE = 500
+
+
+def recipe_amounts(recipe_ids):
+    amounts = Counter()
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount')
+    for ingredient_id, amount in rows:
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+            if delta > 0
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas.keys()
+    )
+    items.update(
+        amount=F('amount') + Case(
+            *[
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    items.filter(amount__lte=0).delete()
+
+
+def amounts_by_recipe(recipe_ids):
+    amounts = defaultdict(Counter)
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount')
+    for recipe_id, ingredient_id, amount in rows:
+        amounts[recipe_id][ingredient_id] += amount
+    return amounts
+
+
+def add_recipes(user, recipe_ids):
+    apply_deltas([user.id], recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user, recipe_ids):
+    remove_cart_rows((user.id, recipe_id) for recipe_id in recipe_ids)
+
+
+def remove_cart_rows(rows):
+    recipe_ids = defaultdict(list)
+    for user_id, recipe_id in rows:
+        recipe_ids[user_id].append(recipe_id)
+    for user_id, ids in recipe_ids.items():
+        amounts = recipe_amounts(ids)
+        apply_deltas(
+            [user_id],
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount in amounts.items()
+            },
+        )
+
+
+def change_recipe(recipe, old_amounts, new_amounts):
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    if not any(deltas.values()):
+        return
+    apply_deltas(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'user_id', flat=True
+        ),
+        deltas,
+    )
+
+
+def sync_recipes(recipe_ids, old_amounts):
+    new_amounts = amounts_by_recipe(recipe_ids)
+    for recipe_id in recipe_ids:
+        change_recipe(
+            recipe_id,
+            old_amounts.get(recipe_id, {}),
+            new_amounts.get(recipe_id, {}),
+        )
+
+
+def delete_recipe(recipe):
+    amounts = recipe_amounts([recipe.id])
+    change_recipe(recipe, amounts, {})
+
+
+def live_totals(user_ids=None):
+    rows = IngredientInRecipe.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(recipe__shopping_cart__user_id__in=user_ids)
+    rows = (
+        rows.exclude(recipe__shopping_cart__user=None)
+        .values_list('recipe__shopping_cart__user_id', 'ingredient_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    return {(user_id, ingredient_id): total
+            for user_id, ingredient_id, total in rows.iterator()}
+
+
+def stored_totals(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    rows = items.values_list('user_id', 'ingredient_id', 'amount')
+    return {(user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in rows.iterator()}
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    totals = live_totals(user_ids)
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for (user_id, ingredient_id), total in totals.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return len(totals)
@@ -0,0 +1,93 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import counters, search, shopping_list, timestamps
+from .autocomplete import ingredient_index
+from .images import refresh_thumbnails
+from .models import Ingredient, IngredientInRecipe, Recipe
+
+User = get_user_model()
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_thumbnails(instance, update_fields, **kwargs):
+    if (
+        instance.image
+        and instance.thumbnails_image != instance.image.name
+        and (update_fields is None or 'image' in update_fields)
+    ):
+        transaction.on_commit(
+            partial(refresh_thumbnails, instance.pk, instance.image)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(instance, update_fields, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        search.schedule((instance.pk,))
+
+
+@receiver(pre_delete, sender=Recipe)
+def delete_recipe_from_shopping_lists(instance, **kwargs):
+    shopping_list.delete_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_search(instance, **kwargs):
+    search.schedule((instance.pk,))
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def update_recipe_ingredients_search(instance, **kwargs):
+    search.schedule((instance.recipe_id,))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search(instance, created, **kwargs):
+    if not created:
+        search.schedule(instance.recipes.values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def touch_recipe_ingredients(instance, **kwargs):
+    timestamps.touch((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        timestamps.touch((instance.pk,))
+    elif action == 'pre_clear':
+        timestamps.touch(instance.recipes.values_list('id', flat=True))
+    else:
+        timestamps.touch(pk_set)
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(instance, **kwargs):
+    counters.change_user(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(pre_delete, sender=User)
+def count_deleted_user(instance, **kwargs):
+    counters.delete_user(instance)
@@ -0,0 +1,197 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from foodgram.testing import RecipeDataMixin
+from users.models import Subscribe
+
+from . import counters, shopping_list
+from .images import refresh_thumbnails, thumbnail_urls
+from .management.commands.check_query_plans import Command
+from .models import Favourite, Recipe, ShoppingCart
+
+
+class ShoppingListAdminTest(RecipeDataMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assert_shopping_lists_match(self):
+        self.assertEqual(
+            shopping_list.stored_totals(), shopping_list.live_totals()
+        )
+
+    def test_recipe_inline_change(self):
+        recipe = self.recipes[0]
+        rows = list(recipe.ingredient_list.order_by('id'))
+        data = {
+            'name': recipe.name,
+            'author': recipe.author_id,
+            'text': recipe.text,
+            'image_status': recipe.image_status,
+            'cooking_time': recipe.cooking_time,
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+            'ingredient_list-TOTAL_FORMS': len(rows) + 1,
+            'ingredient_list-INITIAL_FORMS': len(rows),
+            'ingredient_list-MIN_NUM_FORMS': 0,
+            'ingredient_list-MAX_NUM_FORMS': 1000,
+            'ingredient_list-0-DELETE': 'on',
+            f'ingredient_list-{len(rows)}-recipe': recipe.id,
+            f'ingredient_list-{len(rows)}-ingredient': (
+                self.ingredients[5].id
+            ),
+            f'ingredient_list-{len(rows)}-amount': 7,
+        }
+        for number, row in enumerate(rows):
+            data.update({
+                f'ingredient_list-{number}-id': row.id,
+                f'ingredient_list-{number}-recipe': recipe.id,
+                f'ingredient_list-{number}-ingredient': row.ingredient_id,
+                f'ingredient_list-{number}-amount': row.amount + 5,
+            })
+        response = self.client.post(
+            f'/admin/recipes/recipe/{recipe.id}/change/', data
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_shopping_lists_match()
+
+    def test_shopping_cart_bulk_delete(self):
+        carts = ShoppingCart.objects.filter(recipe__in=self.recipes[:4])
+        response = self.client.post('/admin/recipes/shoppingcart/', {
+            'action': 'delete_selected',
+            '_selected_action': list(carts.values_list('id', flat=True)),
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assert_shopping_lists_match()
+
+    def test_recipe_delete(self):
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipes[3].id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_shopping_lists_match()
+
+
+class CounterAdminTest(RecipeDataMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assert_counters_match(self):
+        self.assertEqual(set(counters.verify().values()), {0})
+
+    def test_favourite_add_and_change(self):
+        response = self.client.post('/admin/recipes/favourite/add/', {
+            'user': self.viewer.id, 'recipe': self.recipes[1].id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+        favourite = Favourite.objects.get(recipe=self.recipes[1])
+        response = self.client.post(
+            f'/admin/recipes/favourite/{favourite.id}/change/',
+            {'user': self.viewer.id, 'recipe': self.recipes[3].id},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+
+    def test_shopping_cart_add_and_bulk_delete(self):
+        response = self.client.post('/admin/recipes/shoppingcart/add/', {
+            'user': self.admin.id, 'recipe': self.recipes[0].id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+        response = self.client.post('/admin/recipes/shoppingcart/', {
+            'action': 'delete_selected',
+            '_selected_action': list(
+                ShoppingCart.objects.filter(
+                    recipe=self.recipes[0]
+                ).values_list('id', flat=True)
+            ),
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+        self.assertEqual(
+            shopping_list.stored_totals(), shopping_list.live_totals()
+        )
+
+    def test_subscription_delete(self):
+        subscription = Subscribe.objects.create(
+            user=self.viewer, author=self.admin
+        )
+        counters.reconcile()
+        response = self.client.post(
+            f'/admin/users/subscribe/{subscription.id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+
+    def test_user_delete(self):
+        response = self.client.post(
+            f'/admin/users/user/{self.viewer.id}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_match()
+
+
+class ThumbnailTest(RecipeDataMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), (200, 120, 40)).save(buffer, 'PNG')
+        self.recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        default_storage.save(
+            self.recipe.image.name, ContentFile(buffer.getvalue())
+        )
+
+    def test_urls_use_stored_flag(self):
+        with mock.patch.object(
+            FileSystemStorage, 'exists', side_effect=AssertionError
+        ):
+            urls = thumbnail_urls(self.recipe)
+        self.assertEqual(
+            set(urls.values()), {self.recipe.image.url}
+        )
+        self.assertTrue(refresh_thumbnails(self.recipe.pk, self.recipe.image))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.thumbnails_image, self.recipe.image.name)
+        with mock.patch.object(
+            FileSystemStorage, 'exists', side_effect=AssertionError
+        ):
+            urls = thumbnail_urls(self.recipe)
+        self.assertTrue(all('/thumbnails/' in url for url in urls.values()))
+
+    def test_changed_image_falls_back_to_original(self):
+        refresh_thumbnails(self.recipe.pk, self.recipe.image)
+        self.recipe.refresh_from_db()
+        self.recipe.image = 'recipes/images/other.png'
+        urls = thumbnail_urls(self.recipe)
+        self.assertEqual(set(urls.values()), {self.recipe.image.url})
+
+
+class QueryPlansTest(RecipeDataMixin, TestCase):
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertIn('All query plans use indexes', output.getvalue())
+
+    def test_sequential_scan_fails(self):
+        checks = Command.get_checks
+        scan = ('recipes by text', Recipe.objects.filter(text='Описание'),
+                'recipes_recipe')
+        with mock.patch.object(
+            Command, 'get_checks', lambda command: checks(command) + (scan,)
+        ), self.assertRaises(CommandError):
+            call_command('check_query_plans', stdout=StringIO())
@@ -0,0 +1,18 @@
+from django.utils import timezone
+
+from .batches import CommitBatch
+from .models import Recipe
+
+
+def _touch(recipe_ids):
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            updated=timezone.now()
+        )
+
+
+_batch = CommitBatch(_touch)
+
+
+def touch(recipe_ids):
+    _batch.add(recipe_ids=recipe_ids)
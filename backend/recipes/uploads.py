@@ -0,0 +1,118 @@
+import base64
+import binascii
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def upload_path(recipe_id):
+    return os.path.join(settings.RECIPE_IMAGE_UPLOAD_DIR, f'{recipe_id}.b64')
+
+
+def pending_recipe_ids():
+    if not os.path.isdir(settings.RECIPE_IMAGE_UPLOAD_DIR):
+        return []
+    return sorted(
+        int(name[:-len('.b64')])
+        for name in os.listdir(settings.RECIPE_IMAGE_UPLOAD_DIR)
+        if name.endswith('.b64') and name[:-len('.b64')].isdigit()
+    )
+
+
+def decode_image(data):
+    if ';base64,' not in data:
+        raise ValueError('Image must be a base64 data URI')
+    raw = base64.b64decode(data.split(';base64,', 1)[1], validate=True)
+    Image.open(BytesIO(raw)).verify()
+    picture = Image.open(BytesIO(raw))
+    image_format = picture.format
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f'Unsupported image format: {image_format}')
+    if image_format in ('JPEG', 'WEBP'):
+        picture = ImageOps.exif_transpose(picture)
+    buffer = BytesIO()
+    picture.save(buffer, format=image_format)
+    return ContentFile(buffer.getvalue()), IMAGE_FORMATS[image_format]
+
+
+def enqueue(recipe, data):
+    os.makedirs(settings.RECIPE_IMAGE_UPLOAD_DIR, exist_ok=True)
+    path = upload_path(recipe.pk)
+    temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary_path, 'w') as upload:
+        upload.write(data)
+    os.replace(temporary_path, path)
+    transaction.on_commit(partial(get_executor().submit, run, recipe.pk))
+
+
+def process(recipe_id):
+    path = upload_path(recipe_id)
+    try:
+        received = os.stat(path).st_mtime_ns
+        with open(path) as upload:
+            data = upload.read()
+    except FileNotFoundError:
+        return
+    try:
+        content, extension = decode_image(data)
+        status = Recipe.IMAGE_READY
+    except (binascii.Error, OSError, ValueError) as error:
+        logger.warning('Recipe %s image rejected: %s', recipe_id, error)
+        content, status = None, Recipe.IMAGE_FAILED
+    try:
+        if os.stat(path).st_mtime_ns != received:
+            return
+    except FileNotFoundError:
+        return
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is not None:
+        if content is not None:
+            recipe.image.save(
+                f'{uuid.uuid4()}.{extension}', content, save=False
+            )
+        recipe.image_status = status
+        recipe.save(update_fields=('image', 'image_status', 'updated'))
+    os.remove(path)
+
+
+def run(recipe_id):
+    try:
+        process(recipe_id)
+    except Exception:
+        logger.exception('Recipe %s image processing failed', recipe_id)
+    finally:
+        connection.close()
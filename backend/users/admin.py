@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
+from recipes import counters
+
 from .models import Subscribe
 
 User = get_user_model()
@@ -15,6 +17,8 @@ class UserAdmin(UserAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'subscribers_count',
     )
     list_filter = ('email', 'first_name')
 
@@ -25,3 +29,25 @@ class SubscribeAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
+
+    def count(self, author_ids, delta):
+        counters.change_rows(User, author_ids, 'subscribers_count', delta)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            self.count(
+                Subscribe.objects.filter(pk=obj.pk).values_list(
+                    'author_id', flat=True
+                ),
+                -1,
+            )
+        super().save_model(request, obj, form, change)
+        self.count([obj.author_id], 1)
+
+    def delete_model(self, request, obj):
+        self.count([obj.author_id], -1)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self.count(queryset.values_list('author_id', flat=True), -1)
+        super().delete_queryset(request, queryset)
@@ -7,8 +7,10 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 from django.db.models import Manager
 
+from .mixins import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     username_validator = UnicodeUsernameValidator()
 
     email = models.EmailField(
@@ -32,6 +34,17 @@ class User(AbstractUser):
             'unique': 'Пользователь с таким именем уже существует.',
         },
     )
+
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+
+    subscribers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
+
+    counter_fields = ('recipes_count', 'subscribers_count')
+
     subscriber: Union[Subscribe, Manager]
     subscribing: Union[Subscribe, Manager]
 